@@ -0,0 +1,220 @@
+"""ASGI-режим для чтения: Django работает в ограниченном пуле потоков.
+
+Django 2.2 не умеет ASGI, поэтому приложение принимает соединение
+в цикле событий, целиком дочитывает тело запроса, вызывает обычный
+WSGI-обработчик в пуле из ASGI_THREADS потоков и отдаёт ответ уже
+из цикла событий. Медленный клиент держит только корутину, а не поток
+с соединением к базе.
+
+Long-polling новых комментариев: GET .../comments/?after=<id>&wait=<сек>
+ждёт в цикле событий, пока у отзыва не появится комментарий новее
+after, и только потом передаётся Django. Все ожидающие запросы процесса
+проверяются одним SQL-запросом раз в LONG_POLL_INTERVAL секунд.
+"""
+import asyncio
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Max
+from reviews.models import Comments
+
+COMMENTS_PATH = re.compile(
+    r'^/api/v1/titles/\d+/reviews/(?P<review_id>\d+)/comments/$'
+)
+
+
+def latest_comments(review_ids):
+    """id последнего комментария каждого из отзывов."""
+    close_old_connections()
+    try:
+        return dict(
+            Comments.objects.filter(review_id__in=review_ids)
+            .values('review_id').annotate(last_id=Max('pk'))
+            .values_list('review_id', 'last_id')
+        )
+    finally:
+        close_old_connections()
+
+
+class CommentWatcher:
+    """Ожидающие новых комментариев запросы одного процесса.
+
+    Пока есть хотя бы один ожидающий, фоновая задача раз в interval
+    секунд одним запросом узнаёт последние комментарии всех отзывов,
+    которых ждут, и будит тех, для кого появилось новое.
+    """
+
+    def __init__(self, executor, interval):
+        self.executor = executor
+        self.interval = interval
+        self.waiters = {}
+        self.task = None
+
+    async def wait(self, review_id, after, timeout):
+        future = asyncio.get_running_loop().create_future()
+        waiter = (after, future)
+        self.waiters.setdefault(review_id, []).append(waiter)
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.poll())
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            waiters = self.waiters.get(review_id, [])
+            if waiter in waiters:
+                waiters.remove(waiter)
+            if not waiters:
+                self.waiters.pop(review_id, None)
+
+    async def poll(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self.waiters:
+                latest = await loop.run_in_executor(
+                    self.executor, latest_comments, list(self.waiters)
+                )
+                for review_id, waiters in list(self.waiters.items()):
+                    last_id = latest.get(review_id, 0)
+                    for after, future in waiters:
+                        if last_id > after and not future.done():
+                            future.set_result(None)
+                await asyncio.sleep(self.interval)
+        finally:
+            self.task = None
+
+
+def build_environ(scope, body):
+    """WSGI-окружение по ASGI-scope (PEP 3333)."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin1'),
+        'PATH_INFO': scope['path'].encode().decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope["http_version"]}',
+        'REMOTE_ADDR': str(client[0]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+def call_wsgi(wsgi_application, environ):
+    """Вызывает WSGI-приложение и целиком собирает ответ."""
+    started = []
+    response = wsgi_application(
+        environ, lambda status, headers, exc_info=None: started.append(
+            (status, headers)
+        )
+    )
+    try:
+        body = b''.join(response)
+    finally:
+        if hasattr(response, 'close'):
+            response.close()
+    status, headers = started[-1]
+    return int(status.split(' ', 1)[0]), headers, body
+
+
+class AsgiApplication:
+    def __init__(self, wsgi_application):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.ASGI_THREADS,
+            thread_name_prefix='django'
+        )
+        self.comments = CommentWatcher(
+            self.executor, settings.LONG_POLL_INTERVAL
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+
+    async def http(self, scope, receive, send):
+        body = await self.read_body(receive)
+        if body is None or not await self.long_poll(scope, receive):
+            return
+        loop = asyncio.get_running_loop()
+        status, headers, content = await loop.run_in_executor(
+            self.executor, call_wsgi, self.wsgi_application,
+            build_environ(scope, body)
+        )
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (name.encode('latin1'), value.encode('latin1'))
+                for name, value in headers
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': content})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Тело запроса или None, если клиент ушёл раньше."""
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    async def long_poll(self, scope, receive):
+        """Ждёт новых комментариев; False, если клиент не дождался."""
+        match = COMMENTS_PATH.match(scope['path'])
+        if scope['method'] != 'GET' or match is None:
+            return True
+        params = parse_qs(scope['query_string'].decode('latin1'))
+        after = params.get('after', [''])[0]
+        wait = params.get('wait', [''])[0]
+        if not (after.isdigit() and wait.isdigit()):
+            return True
+        waiting = asyncio.ensure_future(self.comments.wait(
+            int(match.group('review_id')), int(after),
+            min(int(wait), settings.LONG_POLL_MAX_WAIT)
+        ))
+        disconnect = asyncio.ensure_future(receive())
+        await asyncio.wait(
+            (waiting, disconnect), return_when=asyncio.FIRST_COMPLETED
+        )
+        if waiting.done():
+            disconnect.cancel()
+            return True
+        waiting.cancel()
+        return False
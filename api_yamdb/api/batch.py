@@ -0,0 +1,86 @@
+"""Пакетная выдача объектов по списку ключей (?ids=1,2,3).
+
+Сериализованные объекты кэшируются поштучно на BATCH_CACHE_TIMEOUT
+секунд под ключом с версиями группы: смена любой из них (например,
+'titles' при записи произведений) разом устаревает весь кэш группы,
+а forget() убирает отдельные объекты после их изменения.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from reviews.catalog import catalog, get_version, title_index
+from reviews.stats import TITLE_STATS_VERSION, USER_STATS_VERSION
+
+MAX_BATCH_SIZE = 100
+BATCH_CACHE_TIMEOUT = 30
+# Кроме своих полей объект группы содержит рейтинги, счётчики
+# и slug'и каталога, которые меняются без записи в сам объект.
+GROUP_VERSIONS = {
+    'titles': (
+        title_index.version_key, TITLE_STATS_VERSION, catalog.version_key
+    ),
+    'users': ('users', USER_STATS_VERSION),
+}
+
+
+def parse_batch(value, name, convert=str):
+    """Уникальные ключи из строки через запятую в исходном порядке."""
+    items = [item.strip() for item in value.split(',') if item.strip()]
+    if len(items) > MAX_BATCH_SIZE:
+        raise ValidationError(
+            {name: [f'Не больше {MAX_BATCH_SIZE} значений.']}
+        )
+    try:
+        return list(dict.fromkeys(convert(item) for item in items))
+    except ValueError:
+        raise ValidationError({name: ['Введите список через запятую.']})
+
+
+def group_version(group):
+    return ':'.join(
+        get_version(name) for name in GROUP_VERSIONS.get(group, (group,))
+    )
+
+
+def cache_key(group, version, key):
+    return f'batch:{group}:{version}:{key}'
+
+
+def load_batch(group, keys, load):
+    """Данные по ключам: из кэша, недостающие — одним вызовом load(keys)."""
+    version = group_version(group)
+    cache_keys = {cache_key(group, version, key): key for key in keys}
+    data = {
+        cache_keys[found]: value
+        for found, value in cache.get_many(list(cache_keys)).items()
+    }
+    missing = [key for key in keys if key not in data]
+    if missing:
+        loaded = load(missing)
+        cache.set_many(
+            {cache_key(group, version, key): value
+             for key, value in loaded.items()},
+            BATCH_CACHE_TIMEOUT
+        )
+        data.update(loaded)
+    return data
+
+
+def batch_response(group, keys, load):
+    data = load_batch(group, keys, load)
+    return Response({
+        'results': [data[key] for key in keys if key in data],
+        'not_found': [key for key in keys if key not in data],
+    })
+
+
+def forget(group, keys):
+    """Убирает объекты из кэша после коммита текущей транзакции."""
+    keys = list(keys)
+
+    def delete():
+        version = group_version(group)
+        cache.delete_many([cache_key(group, version, key) for key in keys])
+
+    transaction.on_commit(delete)
@@ -0,0 +1,30 @@
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework.permissions import SAFE_METHODS
+
+
+class CacheControlMixin:
+    """Выставляет Cache-Control и Vary: Authorization для чтения.
+
+    Ответы анонимам одинаковы для всех и могут храниться в общих кэшах
+    (nginx) cache_max_age секунд; ответы с авторизацией — только private.
+    """
+
+    cache_max_age = 5
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if request.method not in SAFE_METHODS:
+            return response
+        patch_vary_headers(response, ('Authorization',))
+        if response.status_code != 200:
+            patch_cache_control(response, no_store=True)
+        elif (request.user.is_authenticated
+              or 'HTTP_AUTHORIZATION' in request.META):
+            patch_cache_control(response, private=True, max_age=0)
+        else:
+            patch_cache_control(
+                response, public=True, max_age=self.cache_max_age
+            )
+        return response
@@ -0,0 +1,71 @@
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+_state = threading.local()
+_lag_checked = {}
+
+LAG_SQL = (
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() '
+    'THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) '
+    'END'
+)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != 'default']
+
+
+def set_use_replica(value):
+    _state.use_replica = value
+
+
+def replica_lag(alias):
+    """Отставание реплики в секундах; недоступная реплика — бесконечно."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = cursor.fetchone()[0]
+    except DatabaseError:
+        return float('inf')
+    return float(lag or 0)
+
+
+def is_fresh(alias):
+    now = time.monotonic()
+    checked_at, fresh = _lag_checked.get(alias, (None, None))
+    if checked_at is None or now - checked_at > settings.REPLICA_LAG_CHECK:
+        fresh = replica_lag(alias) <= settings.REPLICA_MAX_LAG
+        _lag_checked[alias] = (now, fresh)
+    return fresh
+
+
+class ReplicaRouter:
+    """Чтение с реплик, если его разрешил ReplicaMiddleware.
+
+    Реплики, отстающие больше REPLICA_MAX_LAG секунд, пропускаются; если
+    свежих реплик нет, чтение идёт с основной базы.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not getattr(_state, 'use_replica', False):
+            return 'default'
+        fresh = [alias for alias in replica_aliases() if is_fresh(alias)]
+        if not fresh:
+            return 'default'
+        return random.choice(fresh)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
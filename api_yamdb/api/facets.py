@@ -0,0 +1,62 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count
+from reviews.catalog import catalog
+from reviews.models import GenreTitle, Title
+
+from .filters import TitleFilter
+
+FACETS_CACHE_TIMEOUT = 60
+
+
+def cache_key(query_params):
+    selection = sorted(
+        (name, tuple(sorted(query_params.getlist(name))))
+        for name in TitleFilter.base_filters if name in query_params
+    )
+    return 'facets:' + hashlib.md5(repr(selection).encode()).hexdigest()
+
+
+def count_facets(titles):
+    """Считает фасеты тремя сгруппированными запросами.
+
+    titles — отфильтрованная выборка произведений; повторы из-за JOIN
+    по жанрам отсекаются подзапросом по id.
+    """
+    ids = titles.order_by().values('pk')
+    unique_titles = Title.objects.filter(pk__in=ids).order_by()
+    data = catalog.get()
+    genres = (
+        GenreTitle.objects.filter(title__in=ids).order_by()
+        .values_list('genre_id').annotate(count=Count('title_id'))
+    )
+    categories = (
+        unique_titles.exclude(category=None)
+        .values_list('category_id').annotate(count=Count('pk'))
+    )
+    years = unique_titles.values_list('year').annotate(count=Count('pk'))
+    return {
+        'genre': [
+            {'slug': data.genres_by_id[pk].slug, 'count': count}
+            for pk, count in genres if pk in data.genres_by_id
+        ],
+        'category': [
+            {'slug': data.categories_by_id[pk].slug, 'count': count}
+            for pk, count in categories if pk in data.categories_by_id
+        ],
+        'year': [
+            {'value': year, 'count': count}
+            for year, count in sorted(years)
+        ],
+    }
+
+
+def title_facets(titles, query_params):
+    """Фасеты для текущего набора фильтров, закэшированные по нему."""
+    key = cache_key(query_params)
+    facets = cache.get(key)
+    if facets is None:
+        facets = count_facets(titles)
+        cache.set(key, facets, FACETS_CACHE_TIMEOUT)
+    return facets
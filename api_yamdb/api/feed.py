@@ -0,0 +1,73 @@
+from reviews.changes import sequence_changes
+from reviews.models import Category, ChangeLog, Comments, Genre, Review, Title
+
+from .serializers import (CategoryFeedSerializer, CommentFeedSerializer,
+                          GenreFeedSerializer, ReviewFeedSerializer,
+                          TitleFeedSerializer)
+
+FEED_SOURCES = {
+    'category': (
+        lambda: Category.objects.filter(is_deleted=False),
+        CategoryFeedSerializer,
+    ),
+    'genre': (lambda: Genre.objects.all(), GenreFeedSerializer),
+    'title': (
+        lambda: Title.objects.filter(is_deleted=False)
+        .prefetch_related('genre'),
+        TitleFeedSerializer,
+    ),
+    'review': (
+        lambda: Review.objects.select_related('author'),
+        ReviewFeedSerializer,
+    ),
+    'comments': (
+        lambda: Comments.objects.select_related('author'),
+        CommentFeedSerializer,
+    ),
+}
+
+
+def load_objects(entries):
+    """Текущее состояние изменённых объектов: один запрос на модель."""
+    ids = {}
+    for entry in entries:
+        if entry.operation == ChangeLog.UPSERT:
+            ids.setdefault(entry.model, set()).add(entry.object_id)
+    objects = {}
+    for model, model_ids in ids.items():
+        queryset, serializer_class = FEED_SOURCES[model]
+        instances = list(queryset().filter(pk__in=model_ids))
+        objects[model] = {
+            instance.pk: data for instance, data in zip(
+                instances, serializer_class(instances, many=True).data
+            )
+        }
+    return objects
+
+
+def read_changes(since, limit):
+    """Страница журнала изменений после курсора since.
+
+    Курсор — seq, номер в порядке коммитов, поэтому запись долгой
+    транзакции не окажется позади уже выданного курсора. Если объект
+    после upsert уже удалён, object равен None, а tombstone придёт
+    дальше по журналу.
+    """
+    sequence_changes()
+    entries = list(
+        ChangeLog.objects.filter(seq__gt=since).order_by('seq')[:limit]
+    )
+    objects = load_objects(entries)
+    return {
+        'next': entries[-1].seq if entries else since,
+        'results': [
+            {
+                'seq': entry.seq,
+                'model': entry.model,
+                'id': entry.object_id,
+                'operation': entry.operation,
+                'object': objects.get(entry.model, {}).get(entry.object_id),
+            }
+            for entry in entries
+        ],
+    }
@@ -1,16 +1,52 @@
 import django_filters
+from django.core.exceptions import ValidationError
+from django.db.models import F
+from django_filters.fields import ModelMultipleChoiceField
+from rest_framework.filters import OrderingFilter
 from reviews.models import Category, Genre, Title
 
+from .fields import resolve_slugs
+
+
+class SlugMultipleChoiceField(ModelMultipleChoiceField):
+    """Проверяет все slug'и одним запросом и возвращает их id."""
+
+    def _check_values(self, value):
+        try:
+            value = frozenset(value)
+        except TypeError:
+            raise ValidationError(
+                self.error_messages['list'],
+                code='list',
+            )
+        objects = resolve_slugs(self.queryset, value, self.to_field_name)
+        for val in value:
+            if str(val) not in objects:
+                raise ValidationError(
+                    self.error_messages['invalid_choice'],
+                    code='invalid_choice',
+                    params={'value': val},
+                )
+        return [objects[str(val)].pk for val in value]
+
+
+class SlugMultipleChoiceFilter(django_filters.ModelMultipleChoiceFilter):
+    """Фильтр по slug'ам связанной модели без JOIN'а на её таблицу."""
+
+    field_class = SlugMultipleChoiceField
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('to_field_name', 'slug')
+        super().__init__(*args, **kwargs)
+
 
 class TitleFilter(django_filters.FilterSet):
-    genre = django_filters.ModelMultipleChoiceFilter(
-        field_name="genre__slug",
-        to_field_name="slug",
+    genre = SlugMultipleChoiceFilter(
+        field_name='genre',
         queryset=Genre.objects.all(),
     )
-    category = django_filters.ModelMultipleChoiceFilter(
-        field_name="category__slug",
-        to_field_name="slug",
+    category = SlugMultipleChoiceFilter(
+        field_name='category',
         queryset=Category.objects.all(),
     )
     name = django_filters.CharFilter(
@@ -26,3 +62,39 @@ class TitleFilter(django_filters.FilterSet):
             'name',
             'year'
         )
+
+
+class StableOrderingFilter(OrderingFilter):
+    """Сортировка с id в конце: порядок страниц не меняется между запросами.
+
+    id идёт в том же направлении, что и первое поле, чтобы индекс
+    (поле, id) читался целиком в одну сторону. Поля из nulls_last
+    сортируются с NULL в конце в обоих направлениях.
+    """
+
+    nulls_last = ('rating',)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        fields = [field for field in ordering if field.lstrip('-') != 'id']
+        descending = ordering[0].startswith('-')
+        fields.append('-id' if descending else 'id')
+        return fields
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering:
+            return queryset
+        return queryset.order_by(*(
+            self.expression(field) for field in ordering
+        ))
+
+    def expression(self, field):
+        name = field.lstrip('-')
+        if name not in self.nulls_last:
+            return field
+        if field.startswith('-'):
+            return F(name).desc(nulls_last=True)
+        return F(name).asc(nulls_last=True)
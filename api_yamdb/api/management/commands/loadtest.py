@@ -0,0 +1,278 @@
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from rest_framework_simplejwt.tokens import RefreshToken
+from reviews.models import (ADMIN, MODERATOR, USER, Category, Genre, Review,
+                            Title, User)
+
+ROLES = {'user': USER, 'moderator': MODERATOR, 'admin': ADMIN}
+
+# Доля чтений в синтетической трассе.
+READ_SHARE = 0.9
+
+# Синтетические пользователи, от имени которых пишет трасса.
+USERS_PREFIX = 'loadtest_user_'
+
+
+def percentile(values, share):
+    """Перцентиль по методу ближайшего ранга; values отсортированы."""
+    if not values:
+        return 0
+    index = max(0, min(len(values) - 1, round(share * len(values)) - 1))
+    return values[index]
+
+
+def route_of(path):
+    return re.sub(r'/\d+(?=/)', '/{id}', path)
+
+
+def actor(entry):
+    """Роль и номер синтетического пользователя записи трассы."""
+    role = entry.get('role', 'anon')
+    return role, entry.get('user') if role == 'user' else None
+
+
+class TraceSynthesizer:
+    """Генерирует запросы к существующим эндпоинтам по данным из БД.
+
+    Пишут в трассе ``users`` синтетических пользователей. Отзыв
+    к произведению достаётся тому из них, кто его ещё не рецензировал,
+    иначе запрос упирался бы в unique_review и возвращал 400.
+    """
+
+    def __init__(self, users):
+        self.titles = list(
+            Title.objects.filter(is_deleted=False).values_list('pk', 'year')
+        )
+        self.reviews = list(
+            Review.objects.filter(title__is_deleted=False)
+            .values_list('pk', 'title_id')[:10000]
+        )
+        self.genres = list(Genre.objects.values_list('slug', flat=True))
+        self.categories = list(
+            Category.objects.filter(is_deleted=False)
+            .values_list('slug', flat=True)
+        )
+        if not self.titles or not self.reviews:
+            raise CommandError('Для трассы нужны произведения и отзывы в БД.')
+        self.users = users
+        self.reviewed = defaultdict(set)
+        for username, title_id in Review.objects.filter(
+                author__username__startswith=USERS_PREFIX
+        ).values_list('author__username', 'title_id'):
+            suffix = username[len(USERS_PREFIX):]
+            if suffix.isdigit():
+                self.reviewed[int(suffix)].add(title_id)
+
+    def request(self):
+        if random.random() < READ_SHARE:
+            return self.read()
+        return self.write()
+
+    def read(self):
+        title_id, year = random.choice(self.titles)
+        review_id, review_title = random.choice(self.reviews)
+        return random.choice((
+            ('GET', '/api/v1/titles/', {}),
+            ('GET', '/api/v1/titles/', {'genre': self.choice(self.genres)}),
+            ('GET', '/api/v1/titles/',
+             {'category': self.choice(self.categories)}),
+            ('GET', '/api/v1/titles/', {'year': year}),
+            ('GET', f'/api/v1/titles/{title_id}/', {}),
+            ('GET', f'/api/v1/titles/{title_id}/reviews/', {}),
+            ('GET',
+             f'/api/v1/titles/{review_title}/reviews/{review_id}/comments/',
+             {}),
+            ('GET', '/api/v1/categories/', {}),
+            ('GET', '/api/v1/genres/', {}),
+        )) + (random.choice(('anon', 'user')), None, self.user())
+
+    def write(self):
+        title_id, _ = random.choice(self.titles)
+        authors = [
+            user for user in range(self.users)
+            if title_id not in self.reviewed[user]
+        ]
+        if authors and random.random() >= 0.7:
+            author = random.choice(authors)
+            self.reviewed[author].add(title_id)
+            return (
+                'POST', f'/api/v1/titles/{title_id}/reviews/', {}, 'user',
+                {'text': 'Нагрузочный отзыв', 'score': random.randint(1, 10)},
+                author,
+            )
+        review_id, review_title = random.choice(self.reviews)
+        return (
+            'POST',
+            f'/api/v1/titles/{review_title}/reviews/{review_id}/comments/',
+            {}, 'user', {'text': 'Нагрузочный комментарий'}, self.user(),
+        )
+
+    def user(self):
+        return random.randrange(self.users)
+
+    @staticmethod
+    def choice(values):
+        return random.choice(values) if values else ''
+
+
+class Command(BaseCommand):
+    help = ('Synthesizes a JSONL request trace or replays it against the API '
+            'and reports throughput, latency percentiles and error rates')
+
+    def add_arguments(self, parser):
+        parser.add_argument('mode', choices=('synthesize', 'replay'))
+        parser.add_argument('trace', help='Path to the JSONL trace')
+        parser.add_argument('--requests', type=int, default=1000,
+                            help='Number of requests to synthesize')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--users', type=int, default=50,
+                            help='Synthetic users the trace writes as')
+        parser.add_argument(
+            '--base-url', default=None,
+            help='Replay against a running server instead of in-process'
+        )
+
+    def handle(self, *args, **options):
+        if options['mode'] == 'synthesize':
+            self.synthesize(options['trace'], options['requests'],
+                            options['users'])
+        else:
+            self.replay(options['trace'], options['concurrency'],
+                        options['base_url'])
+
+    def synthesize(self, path, count, users):
+        synthesizer = TraceSynthesizer(users)
+        with open(path, 'w', encoding='utf-8') as trace:
+            for _ in range(count):
+                method, url, query, role, body, user = synthesizer.request()
+                trace.write(json.dumps({
+                    'method': method, 'path': url, 'query': query,
+                    'role': role, 'user': user, 'body': body,
+                }, ensure_ascii=False) + '\n')
+        self.stdout.write(f'Записано {count} запросов в {path}')
+
+    def replay(self, path, concurrency, base_url):
+        with open(path, encoding='utf-8') as trace:
+            entries = [json.loads(line) for line in trace if line.strip()]
+        tokens = self.tokens({actor(entry) for entry in entries})
+        send = RemoteSender(base_url) if base_url else LocalSender()
+        results = defaultdict(list)
+        lock = threading.Lock()
+
+        def run(entry):
+            headers = {}
+            token = tokens.get(actor(entry))
+            if token:
+                headers['Authorization'] = f'Bearer {token}'
+            started = time.perf_counter()
+            try:
+                status = send(entry, headers)
+            except Exception:
+                status = None
+            elapsed = time.perf_counter() - started
+            route = f"{entry['method']} {route_of(entry['path'])}"
+            with lock:
+                results[route].append((elapsed, status))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(run, entries))
+        self.report(results, time.perf_counter() - started)
+
+    def tokens(self, actors):
+        tokens = {}
+        for role, number in actors:
+            if role not in ROLES:
+                continue
+            username = f'loadtest_{role}'
+            if number is not None:
+                username = f'loadtest_{role}_{number}'
+            user, _ = User.objects.get_or_create(
+                username=username,
+                defaults={'email': f'{username}@example.com',
+                          'role': ROLES[role]},
+            )
+            tokens[role, number] = str(
+                RefreshToken.for_user(user).access_token
+            )
+        return tokens
+
+    def report(self, results, elapsed):
+        total = sum(len(samples) for samples in results.values())
+        self.stdout.write(
+            f'{total} запросов за {elapsed:.2f} с, '
+            f'{total / elapsed:.1f} запросов/с'
+        )
+        self.stdout.write(
+            f"{'route':60} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'p99 ms':>8} {'4xx %':>6} {'err %':>6}"
+        )
+        for route, samples in sorted(results.items()):
+            latencies = sorted(elapsed * 1000 for elapsed, _ in samples)
+            client_errors = sum(
+                1 for _, status in samples
+                if status is not None and 400 <= status < 500
+            )
+            errors = sum(
+                1 for _, status in samples if status is None or status >= 500
+            )
+            self.stdout.write(
+                f'{route:60} {len(samples):6} '
+                f'{percentile(latencies, 0.5):8.1f} '
+                f'{percentile(latencies, 0.95):8.1f} '
+                f'{percentile(latencies, 0.99):8.1f} '
+                f'{100 * client_errors / len(samples):6.1f} '
+                f'{100 * errors / len(samples):6.1f}'
+            )
+
+
+class LocalSender:
+    """Выполняет запросы в этом же процессе через django.test.Client."""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def __call__(self, entry, headers):
+        if not hasattr(self.local, 'client'):
+            self.local.client = Client()
+        extra = {
+            'HTTP_' + name.upper().replace('-', '_'): value
+            for name, value in headers.items()
+        }
+        method = getattr(self.local.client, entry['method'].lower())
+        if entry['method'] in ('GET', 'HEAD'):
+            response = method(entry['path'], entry.get('query') or {},
+                              **extra)
+        else:
+            response = method(
+                entry['path'], json.dumps(entry.get('body') or {}),
+                content_type='application/json', **extra
+            )
+        return response.status_code
+
+
+class RemoteSender:
+    """Выполняет запросы к запущенному серверу."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.local = threading.local()
+
+    def __call__(self, entry, headers):
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        response = self.local.session.request(
+            entry['method'], self.base_url + entry['path'],
+            params=entry.get('query') or None, json=entry.get('body'),
+            headers=headers, timeout=30,
+        )
+        return response.status_code
@@ -0,0 +1,174 @@
+import cProfile
+import hashlib
+import io
+import logging
+import pstats
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from django.http import JsonResponse
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .db_routers import replica_aliases, set_use_replica
+from .querybudget import (QueryBudgetExceeded, check_queries, record_queries,
+                          view_budget)
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaMiddleware:
+    """Отправляет безопасные запросы к вьюсетам API на реплики.
+
+    После успешной записи клиент с токеном на REPLICA_PIN_SECONDS секунд
+    закрепляется за основной базой, чтобы видеть свои изменения.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = bool(replica_aliases())
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            set_use_replica(False)
+        pin_key = self.pin_key(request)
+        if (pin_key and request.method not in SAFE_METHODS
+                and response.status_code < 400):
+            cache.set(pin_key, True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self.enabled:
+            return
+        view_class = getattr(view_func, 'cls', None)
+        set_use_replica(
+            request.method in SAFE_METHODS
+            and getattr(view_class, '__module__', None) == 'api.views'
+            and not self.is_pinned(request)
+        )
+
+    def is_pinned(self, request):
+        pin_key = self.pin_key(request)
+        return bool(pin_key) and bool(cache.get(pin_key))
+
+    def pin_key(self, request):
+        """Ключ закрепления по токену; анонимные запросы не закрепляются.
+
+        За nginx у всех анонимных клиентов один REMOTE_ADDR, и одна
+        регистрация закрепляла бы за основной базой всех сразу.
+        """
+        token = request.META.get('HTTP_AUTHORIZATION')
+        if not token:
+            return None
+        return 'replica-pin:' + hashlib.sha1(token.encode()).hexdigest()
+
+
+class QueryBudgetMiddleware:
+    """Считает SQL-запросы каждого запроса и сверяет с бюджетом вьюсета.
+
+    Включается переменной окружения QUERY_BUDGET: при ``warn`` нарушения
+    пишутся в лог, при ``raise`` запрос падает с QueryBudgetExceeded
+    (так их ловит pytest-плагин). Число запросов отдаётся в заголовке
+    X-Query-Count.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.strict = settings.QUERY_BUDGET == 'raise'
+
+    def __call__(self, request):
+        request.query_budget = None
+        with record_queries() as queries:
+            response = self.get_response(request)
+        problems = check_queries(queries, request.query_budget)
+        response['X-Query-Count'] = str(len(queries))
+        if problems:
+            message = f'{request.method} {request.path}: ' + '; '.join(
+                problems
+            )
+            if self.strict:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = view_budget(view_func, request.method)
+
+
+class ProfilerMiddleware:
+    """Профилирует отдельный запрос администратора.
+
+    Запрос с заголовком ``X-Profile: 1`` или параметром ``?profile=1``
+    выполняется под cProfile, а вместо ответа возвращается профиль
+    вызовов, выполненный SQL и планы запросов. Остальные запросы
+    не затрагиваются.
+    """
+
+    stats_limit = 40
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.requested(request) or not self.is_admin(request):
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        with record_queries() as queries:
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        duration = (time.perf_counter() - started) * 1000
+        for query in queries:
+            query['plan'] = self.explain(query)
+            query['params'] = repr(query['params'])
+        return JsonResponse({
+            'status': response.status_code,
+            'duration_ms': duration,
+            'queries': queries,
+            'profile': self.format_stats(profiler),
+        }, json_dumps_params={'ensure_ascii': False, 'indent': 2})
+
+    def requested(self, request):
+        return (request.META.get('HTTP_X_PROFILE') == '1'
+                or request.GET.get('profile') == '1')
+
+    def is_admin(self, request):
+        try:
+            authenticated = JWTAuthentication().authenticate(request)
+        except APIException:
+            return False
+        if authenticated is None:
+            return False
+        user = authenticated[0]
+        return user.is_admin or user.is_superuser
+
+    def explain(self, query):
+        if not query['sql'].lstrip().upper().startswith('SELECT'):
+            return None
+        connection = connections[query['alias']]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    connection.ops.explain_query_prefix() + ' ' + query['sql'],
+                    query['params']
+                )
+                return [' '.join(map(str, row)) for row in cursor.fetchall()]
+        except DatabaseError as error:
+            return [str(error)]
+
+    def format_stats(self, profiler):
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats('cumulative').print_stats(self.stats_limit)
+        stats.print_callees(self.stats_limit)
+        return stream.getvalue()
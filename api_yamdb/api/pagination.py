@@ -0,0 +1,38 @@
+from collections import OrderedDict
+from functools import partial
+
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from reviews.pagination import (COUNT_CACHE_TIMEOUT, COUNT_THRESHOLD,
+                                EstimatedCountPaginator)
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """Пагинация с приблизительным количеством для больших таблиц.
+
+    Порог и время кэширования можно переопределить во вьюсете атрибутами
+    ``count_threshold`` и ``count_cache_timeout``.
+    """
+
+    count_threshold = COUNT_THRESHOLD
+    count_cache_timeout = COUNT_CACHE_TIMEOUT
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.django_paginator_class = partial(
+            EstimatedCountPaginator,
+            threshold=getattr(view, 'count_threshold', self.count_threshold),
+            cache_timeout=getattr(
+                view, 'count_cache_timeout', self.count_cache_timeout
+            ),
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        paginator = self.page.paginator
+        return Response(OrderedDict([
+            ('count', paginator.count),
+            ('count_is_approximate', paginator.count_is_approximate),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
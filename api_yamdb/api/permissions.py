@@ -40,3 +40,11 @@ class CommentReviewPermission(
                 or request.user.is_admin
                 or request.user.is_moderator
                 or obj.author == request.user)
+
+
+class IsModeratorOrAdmin(BasePermission):
+    def has_permission(self, request, view):
+        return (request.user.is_authenticated
+                and (request.user.is_admin
+                     or request.user.is_moderator
+                     or request.user.is_superuser))
@@ -0,0 +1,38 @@
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from reviews.models import Comments
+
+
+def comment_previews(review_ids, limit):
+    """Первые limit комментариев каждого отзыва одним оконным запросом.
+
+    ROW_NUMBER() OVER (PARTITION BY review_id) нумерует комментарии
+    внутри отзыва, внешний SELECT отбрасывает лишние. Возвращает словарь
+    review_id -> список комментариев с атрибутом author_name.
+    """
+    if not review_ids:
+        return {}
+    ranked = (
+        Comments.objects
+        .filter(review_id__in=review_ids, author__is_deleted=False)
+        .annotate(
+            comment_rank=Window(
+                expression=RowNumber(),
+                partition_by=[F('review_id')],
+                order_by=[F('pub_date').asc(), F('pk').asc()],
+            ),
+            author_name=F('author__username'),
+        )
+        .values('pk', 'review_id', 'text', 'pub_date', 'author_name',
+                'comment_rank')
+    )
+    sql, params = ranked.query.sql_with_params()
+    comments = Comments.objects.raw(
+        f'SELECT * FROM ({sql}) ranked WHERE comment_rank <= %s '
+        'ORDER BY review_id, comment_rank',
+        params + (limit,)
+    )
+    previews = {}
+    for comment in comments:
+        previews.setdefault(comment.review_id, []).append(comment)
+    return previews
@@ -0,0 +1,50 @@
+"""pytest-плагин: бюджеты SQL-запросов и поиск N+1 в тестах.
+
+Подключается в tests/conftest.py. Во время тестов QueryBudgetMiddleware
+работает в строгом режиме: запрос к вьюсету, превысивший бюджет своего
+действия или повторивший один запрос N раз, роняет тест. Для отдельных
+участков есть фикстура ``query_budget`` и маркер ``query_budget(n)``.
+"""
+from contextlib import contextmanager
+
+import pytest
+
+from .querybudget import (QUERY_REPEAT_THRESHOLD, QueryBudgetExceeded,
+                          check_queries, record_queries)
+
+MIDDLEWARE = 'api.middleware.QueryBudgetMiddleware'
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'query_budget(n): тест выполняет не больше n SQL-запросов'
+    )
+
+
+@contextmanager
+def enforce_budget(budget=None, threshold=QUERY_REPEAT_THRESHOLD):
+    with record_queries() as queries:
+        yield queries
+    problems = check_queries(queries, budget, threshold)
+    if problems:
+        raise QueryBudgetExceeded('; '.join(problems))
+
+
+@pytest.fixture
+def query_budget():
+    """``with query_budget(3): ...`` — не больше трёх запросов и без N+1."""
+    return enforce_budget
+
+
+@pytest.fixture(autouse=True)
+def _view_query_budgets(request, settings):
+    settings.QUERY_BUDGET = 'raise'
+    if MIDDLEWARE not in settings.MIDDLEWARE:
+        settings.MIDDLEWARE = [MIDDLEWARE] + list(settings.MIDDLEWARE)
+    marker = request.node.get_closest_marker('query_budget')
+    if marker is None:
+        yield
+        return
+    with enforce_budget(*marker.args, **marker.kwargs):
+        yield
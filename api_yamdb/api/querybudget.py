@@ -0,0 +1,109 @@
+"""Учёт SQL-запросов на запрос к API: бюджеты и поиск N+1.
+
+Бюджет объявляется во вьюсете словарём ``query_budget`` по действиям,
+например ``{'list': 4, 'retrieve': 3}``. Повторы одного и того же
+запроса (с точностью до параметров) от ``QUERY_REPEAT_THRESHOLD`` раз
+считаются N+1. Проверку выполняют QueryBudgetMiddleware
+(см. api/middleware.py) и pytest-плагин api/pytest_plugin.py.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+QUERY_REPEAT_THRESHOLD = 3
+
+# Управление транзакциями не считается: SQLite, в отличие от Postgres,
+# пишет BEGIN в список запросов.
+IGNORED_STATEMENTS = (
+    'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO', 'BEGIN',
+)
+
+LITERALS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryRecorder:
+    def __init__(self, alias):
+        self.alias = alias
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': self.alias,
+                'sql': sql,
+                'params': params,
+                'duration_ms': (time.perf_counter() - started) * 1000,
+            })
+
+
+@contextmanager
+def record_queries(aliases=None):
+    """Собирает запросы ко всем базам внутри блока в общий список."""
+    recorders = [QueryRecorder(alias) for alias in aliases or connections]
+    queries = []
+    with ExitStack() as stack:
+        for recorder in recorders:
+            stack.enter_context(
+                connections[recorder.alias].execute_wrapper(recorder)
+            )
+        try:
+            yield queries
+        finally:
+            queries.extend(
+                query for recorder in recorders for query in recorder.queries
+            )
+
+
+def fingerprint(sql):
+    """SQL без литералов и длины списков IN: одинаков для N+1-повторов."""
+    for pattern, replacement in LITERALS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def counted(queries):
+    return [
+        query for query in queries
+        if not query['sql'].lstrip().upper().startswith(IGNORED_STATEMENTS)
+    ]
+
+
+def repeated_queries(queries, threshold=QUERY_REPEAT_THRESHOLD):
+    counts = Counter(fingerprint(query['sql']) for query in counted(queries))
+    return {sql: count for sql, count in counts.items() if count >= threshold}
+
+
+def view_budget(view_func, method):
+    """Бюджет действия вьюсета для метода запроса или None."""
+    view_class = getattr(view_func, 'cls', None)
+    budgets = getattr(view_class, 'query_budget', None)
+    actions = getattr(view_func, 'actions', None)
+    if not budgets or not actions:
+        return None
+    return budgets.get(actions.get(method.lower()))
+
+
+def check_queries(queries, budget=None, threshold=QUERY_REPEAT_THRESHOLD):
+    """Список нарушений: превышение бюджета и повторяющиеся запросы."""
+    problems = []
+    total = len(counted(queries))
+    if budget is not None and total > budget:
+        problems.append(f'{total} запросов при бюджете {budget}')
+    for sql, count in repeated_queries(queries, threshold).items():
+        problems.append(f'N+1: {count} раз {sql[:200]}')
+    return problems
@@ -1,19 +1,25 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Prefetch
 from rest_framework import serializers
-from rest_framework.relations import SlugRelatedField
-from rest_framework.serializers import IntegerField, ModelSerializer
+from rest_framework.serializers import (IntegerField, ModelSerializer,
+                                        SerializerMethodField)
+from rest_framework.settings import api_settings
 from rest_framework.validators import UniqueValidator
-from reviews.models import Category, Comments, Genre, Review, Title, User
+from reviews.catalog import catalog
+from reviews.models import (Category, Comments, Genre, GenreTitle, RatingStats,
+                            Review, Title, TitleSimilarity, User)
+
+from .fields import BulkSlugRelatedField, resolve_slugs
+
+MAX_BULK_TITLES = 1000
+MAX_MODERATION_IDS = 1000
 
 
 class RegistrationSerializer(serializers.ModelSerializer):
-    username = serializers.CharField(
-        required=True,
-        validators=[UniqueValidator(queryset=User.objects.all()), ]
-    )
-    email = serializers.EmailField(
-        required=True,
-        validators=[UniqueValidator(queryset=User.objects.all())]
-    )
+    """Уникальность username и email (без учёта регистра) проверяет БД."""
+
+    username = serializers.CharField(required=True)
+    email = serializers.EmailField(required=True)
 
     class Meta:
         model = User
@@ -35,21 +41,41 @@ class RegistrationSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Почта обязательна для заполнения'
             )
-        if User.objects.filter(email__iexact=value).exists():
+        return value
+
+    def create(self, validated_data):
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
             raise serializers.ValidationError(
-                'Пользователь с таким email уже существует.'
+                self.duplicate_errors(validated_data)
             )
-        return value
+
+    def duplicate_errors(self, data):
+        errors = {}
+        if User.objects.filter(username=data['username']).exists():
+            errors['username'] = [UniqueValidator.message]
+        if User.objects.filter(email=data['email']).exists():
+            errors['email'] = [UniqueValidator.message]
+        elif User.objects.filter(email__iexact=data['email']).exists():
+            errors['email'] = ['Пользователь с таким email уже существует.']
+        return errors or {
+            api_settings.NON_FIELD_ERRORS_KEY: [UniqueValidator.message]
+        }
 
 
 class UserSerializer(serializers.ModelSerializer):
+    average_score = serializers.FloatField(read_only=True)
 
     class Meta:
         model = User
         fields = (
             'username', 'email', 'bio', 'role',
-            'first_name', 'last_name'
+            'first_name', 'last_name',
+            'reviews_count', 'comments_count', 'average_score'
         )
+        read_only_fields = ('reviews_count', 'comments_count')
         lookup_field = 'username'
 
         def __str__(self):
@@ -58,14 +84,16 @@ class UserSerializer(serializers.ModelSerializer):
 
 class UserMeSerializer(serializers.ModelSerializer):
     role = serializers.StringRelatedField(read_only=True)
+    average_score = serializers.FloatField(read_only=True)
 
     class Meta:
         model = User
         fields = (
             'username', 'email', 'bio', 'role',
-            'first_name', 'last_name'
+            'first_name', 'last_name',
+            'reviews_count', 'comments_count', 'average_score'
         )
-        read_only_fields = ('role',)
+        read_only_fields = ('role', 'reviews_count', 'comments_count')
 
 
 class TokenCodeSerializer(serializers.Serializer):
@@ -73,6 +101,48 @@ class TokenCodeSerializer(serializers.Serializer):
     confirmation_code = serializers.CharField(required=True)
 
 
+class ModerationSerializer(serializers.Serializer):
+    """Выборка объектов для массовой модерации: по id или по автору."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        max_length=MAX_MODERATION_IDS,
+        required=False
+    )
+    author = serializers.SlugRelatedField(
+        slug_field='username',
+        queryset=User.objects.all(),
+        required=False
+    )
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        if not data.get('ids') and 'author' not in data:
+            raise serializers.ValidationError(
+                'Укажите ids или author.'
+            )
+        if ('since' in data and 'until' in data
+                and data['since'] > data['until']):
+            raise serializers.ValidationError(
+                'since не может быть позже until.'
+            )
+        return data
+
+    def filter_queryset(self, queryset):
+        data = self.validated_data
+        lookups = {}
+        if data.get('ids'):
+            lookups['pk__in'] = data['ids']
+        if 'author' in data:
+            lookups['author'] = data['author']
+        if 'since' in data:
+            lookups['pub_date__gte'] = data['since']
+        if 'until' in data:
+            lookups['pub_date__lt'] = data['until']
+        return queryset.filter(**lookups)
+
+
 class CategorySerializer(ModelSerializer):
     id = serializers.IntegerField(write_only=True, required=False)
 
@@ -87,15 +157,69 @@ class CategorySerializer(ModelSerializer):
 class GenreSerializer(ModelSerializer):
     class Meta:
         model = Genre
-        exclude = ('id', )
+        exclude = ('id', 'updated_at')
+
+
+class TitleListSerializer(serializers.ListSerializer):
+    """Пакетное создание произведений одной транзакцией."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            if len(data) > MAX_BULK_TITLES:
+                raise serializers.ValidationError(
+                    f'Не больше {MAX_BULK_TITLES} произведений за запрос.'
+                )
+            self.preload_relations(data)
+        return super().to_internal_value(data)
+
+    def preload_relations(self, data):
+        categories, genres = set(), set()
+        for item in data:
+            if not isinstance(item, dict):
+                continue
+            if isinstance(item.get('category'), str):
+                categories.add(item['category'])
+            if isinstance(item.get('genre'), list):
+                genres.update(
+                    slug for slug in item['genre'] if isinstance(slug, str)
+                )
+        self.context['preloaded'] = {
+            Category: resolve_slugs(Category.objects.all(), categories),
+            Genre: resolve_slugs(Genre.objects.all(), genres),
+        }
+
+    def create(self, validated_data):
+        titles = [
+            Title(**{
+                key: value for key, value in item.items() if key != 'genre'
+            })
+            for item in validated_data
+        ]
+        with transaction.atomic():
+            if connection.features.can_return_ids_from_bulk_insert:
+                Title.objects.bulk_create(titles)
+            else:
+                for title in titles:
+                    title.save()
+            GenreTitle.objects.bulk_create(
+                GenreTitle(title=title, genre=genre)
+                for title, item in zip(titles, validated_data)
+                for genre in set(item.get('genre', ()))
+            )
+        return list(
+            Title.objects.filter(pk__in=[title.pk for title in titles])
+            .select_related('category')
+            .prefetch_related(Prefetch('genre', to_attr='preloaded_genre'))
+            .order_by('pk')
+        )
 
 
 class TitleSerializer(ModelSerializer):
-    category = SlugRelatedField(
+    category = BulkSlugRelatedField(
         queryset=Category.objects.all(),
         slug_field='slug'
     )
-    genre = SlugRelatedField(
+    genre = BulkSlugRelatedField(
         queryset=Genre.objects.all(),
         many=True,
         slug_field='slug'
@@ -105,11 +229,12 @@ class TitleSerializer(ModelSerializer):
         model = Title
         fields = ('id', 'name', 'year', 'description',
                   'genre', 'category')
+        list_serializer_class = TitleListSerializer
 
 
 class TitleReadSerializer(ModelSerializer):
-    genre = GenreSerializer(read_only=True, many=True)
-    category = CategorySerializer(read_only=True)
+    genre = SerializerMethodField()
+    category = SerializerMethodField()
     rating = IntegerField(read_only=True, required=False, default=None)
 
     class Meta:
@@ -129,6 +254,37 @@ class TitleReadSerializer(ModelSerializer):
     def __str__(self):
         return self.name
 
+    def get_genre(self, title):
+        genres_by_id = catalog.get().genres_by_id
+        genres = [
+            genres_by_id[link.genre_id]
+            for link in title.genretitle_set.all()
+            if link.genre_id in genres_by_id
+        ]
+        return GenreSerializer(genres, many=True).data
+
+    def get_category(self, title):
+        category = catalog.get().categories_by_id.get(title.category_id)
+        if category is None:
+            return None
+        return CategorySerializer(category).data
+
+
+class SimilarTitleSerializer(ModelSerializer):
+    id = IntegerField(source='similar.id')
+    name = serializers.CharField(source='similar.name')
+    year = IntegerField(source='similar.year')
+
+    class Meta:
+        model = TitleSimilarity
+        fields = ('id', 'name', 'year', 'score')
+
+
+class RatingStatsSerializer(ModelSerializer):
+    class Meta:
+        model = RatingStats
+        fields = ('reviews_count', 'average', 'variance', 'updated_at')
+
 
 class ReviewSerializer(serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
@@ -141,24 +297,84 @@ class ReviewSerializer(serializers.ModelSerializer):
         model = Review
         fields = ('id', 'title', 'text', 'author', 'score', 'pub_date')
 
-    def validate(self, data):
-        if self.context['request'].method == 'PATCH':
-            return data
-        title = self.context['view'].kwargs['title_id']
-        author = self.context['request'].user
-        if Review.objects.filter(author=author, title__id=title).exists():
-            raise serializers.ValidationError(
-                'Возможен один отзыв!')
-        return data
+    def create(self, validated_data):
+        # Один отзыв на произведение гарантирует constraint unique_review.
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: ['Возможен один отзыв!']
+            })
 
 
 class CommentSerializer(serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         slug_field='username',
-        read_only=True,
-        validators=[UniqueValidator(queryset=Comments.objects.all())]
+        read_only=True
     )
 
     class Meta:
         model = Comments
         fields = ('id', 'text', 'author', 'pub_date')
+
+
+class CommentPreviewSerializer(CommentSerializer):
+    author = serializers.CharField(source='author_name', read_only=True)
+
+
+class ReviewWithCommentsSerializer(ReviewSerializer):
+    """Отзыв с первыми комментариями из context['comment_previews']."""
+
+    comments = SerializerMethodField()
+
+    class Meta(ReviewSerializer.Meta):
+        fields = ReviewSerializer.Meta.fields + ('comments',)
+
+    def get_comments(self, review):
+        return CommentPreviewSerializer(
+            self.context['comment_previews'].get(review.pk, []), many=True
+        ).data
+
+
+class CategoryFeedSerializer(ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ('id', 'name', 'slug', 'updated_at')
+
+
+class GenreFeedSerializer(ModelSerializer):
+    class Meta:
+        model = Genre
+        fields = ('id', 'name', 'slug', 'updated_at')
+
+
+class TitleFeedSerializer(ModelSerializer):
+    class Meta:
+        model = Title
+        fields = (
+            'id', 'name', 'year', 'description', 'category', 'genre',
+            'updated_at'
+        )
+
+
+class ReviewFeedSerializer(ModelSerializer):
+    author = serializers.SlugRelatedField(
+        slug_field='username', read_only=True
+    )
+
+    class Meta:
+        model = Review
+        fields = (
+            'id', 'title', 'author', 'text', 'score', 'pub_date', 'updated_at'
+        )
+
+
+class CommentFeedSerializer(ModelSerializer):
+    author = serializers.SlugRelatedField(
+        slug_field='username', read_only=True
+    )
+
+    class Meta:
+        model = Comments
+        fields = ('id', 'review', 'author', 'text', 'pub_date', 'updated_at')
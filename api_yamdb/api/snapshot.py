@@ -0,0 +1,188 @@
+"""Колоночный снимок каталога произведений в памяти воркера.
+
+Включается настройкой CATALOG_SNAPSHOT. Список /titles/ с фильтрами
+TitleFilter и сортировками ?ordering= тогда считается операциями numpy
+над массивами и не обращается к базе. Снимок состоит из двух частей:
+структуры (id, год, категория, жанры, порядок по названию) — она
+перечитывается при смене версий 'titles' и 'catalog', — и рейтингов,
+которые меняются чаще и перечитываются по версии 'title-stats'.
+"""
+import numpy as np
+from django.db import DEFAULT_DB_ALIAS
+from reviews.catalog import VersionedCache, catalog, get_version
+from reviews.models import GenreTitle, Title
+from reviews.stats import TITLE_STATS_VERSION
+
+from .serializers import CategorySerializer, GenreSerializer
+
+NO_CATEGORY = -1
+
+
+class TitleColumns:
+    def __init__(self, titles, links):
+        self.rows = titles
+        self.ids = np.array([title['id'] for title in titles], dtype=np.int64)
+        self.years = np.array(
+            [title['year'] for title in titles], dtype=np.float64
+        )
+        self.categories = np.array(
+            [title['category_id'] or NO_CATEGORY for title in titles],
+            dtype=np.int64
+        )
+        # upper(), а не casefold(): icontains в Postgres сравнивает
+        # UPPER(name) LIKE UPPER(%s), и ß должна совпадать так же.
+        self.upper_names = np.array(
+            [title['name'].upper() for title in titles], dtype=np.str_
+        )
+        # Порядок по названию берётся из базы: так совпадает collation.
+        self.name_ranks = np.array(
+            [title['name_rank'] for title in titles], dtype=np.float64
+        )
+        self.genres = {}
+        for title in titles:
+            title['genre_ids'] = []
+        positions = {title['id']: i for i, title in enumerate(titles)}
+        for title_id, genre_id in links:
+            position = positions.get(title_id)
+            if position is None:
+                continue
+            titles[position]['genre_ids'].append(genre_id)
+            if genre_id not in self.genres:
+                self.genres[genre_id] = np.zeros(len(titles), dtype=bool)
+            self.genres[genre_id][position] = True
+
+
+class TitleColumnsCache(VersionedCache):
+    version_key = 'titles'
+
+    def current_version(self):
+        return get_version('titles'), get_version('catalog')
+
+    def load(self):
+        titles = list(
+            Title.objects.using(DEFAULT_DB_ALIAS)
+            .filter(is_deleted=False).order_by('id')
+            .values('id', 'name', 'year', 'description', 'category_id')
+        )
+        ranks = {
+            pk: rank for rank, pk in enumerate(
+                Title.objects.using(DEFAULT_DB_ALIAS).filter(is_deleted=False)
+                .order_by('name', 'id').values_list('pk', flat=True)
+            )
+        }
+        for title in titles:
+            title['name_rank'] = ranks[title['id']]
+        links = (
+            GenreTitle.objects.using(DEFAULT_DB_ALIAS).order_by('pk')
+            .values_list('title_id', 'genre_id')
+        )
+        return TitleColumns(titles, list(links))
+
+
+class TitleRatingsCache(VersionedCache):
+    version_key = TITLE_STATS_VERSION
+
+    def load(self):
+        rows = list(
+            Title.objects.using(DEFAULT_DB_ALIAS)
+            .filter(is_deleted=False).order_by('id')
+            .values_list('id', 'rating', 'reviews_count')
+        )
+        return (
+            np.array([row[0] for row in rows], dtype=np.int64),
+            np.array([row[1] for row in rows], dtype=np.float64),
+            np.array([row[2] for row in rows], dtype=np.float64),
+        )
+
+
+class TitleSnapshot:
+    """Отбор, сортировка и выдача страниц списка произведений."""
+
+    def __init__(self):
+        self.columns = TitleColumnsCache()
+        self.ratings = TitleRatingsCache()
+
+    def stats(self, columns):
+        """Рейтинги и число отзывов, выровненные по id структуры."""
+        ids, ratings, counts = self.ratings.get()
+        aligned_ratings = np.full(len(columns.ids), np.nan)
+        aligned_counts = np.zeros(len(columns.ids))
+        if len(ids):
+            positions = np.searchsorted(ids, columns.ids).clip(
+                max=len(ids) - 1
+            )
+            found = ids[positions] == columns.ids
+            aligned_ratings[found] = ratings[positions[found]]
+            aligned_counts[found] = counts[positions[found]]
+        return aligned_ratings, aligned_counts
+
+    def select(self, filters, ordering):
+        """Позиции подходящих произведений в порядке ordering.
+
+        filters — cleaned_data формы TitleFilter, ordering — поля
+        StableOrderingFilter (с id в конце).
+        """
+        columns = self.columns.get()
+        mask = np.ones(len(columns.ids), dtype=bool)
+        if filters.get('genre'):
+            genres = np.zeros(len(columns.ids), dtype=bool)
+            for genre_id in filters['genre']:
+                if genre_id in columns.genres:
+                    genres |= columns.genres[genre_id]
+            mask &= genres
+        if filters.get('category'):
+            mask &= np.isin(columns.categories, list(filters['category']))
+        if filters.get('year') is not None:
+            mask &= columns.years == float(filters['year'])
+        positions = np.flatnonzero(mask)
+        if filters.get('name'):
+            found = np.char.find(
+                columns.upper_names[positions], filters['name'].upper()
+            )
+            positions = positions[found >= 0]
+        ratings, counts = self.stats(columns)
+        values = {
+            'id': columns.ids,
+            'year': columns.years,
+            'name': columns.name_ranks,
+            'rating': ratings,
+            'reviews_count': counts,
+        }
+        keys = []
+        for field in reversed(ordering):
+            column = values[field.lstrip('-')][positions].astype(np.float64)
+            if field.startswith('-'):
+                column = -column
+            column[np.isnan(column)] = np.inf
+            keys.append(column)
+        return positions[np.lexsort(keys)]
+
+    def render(self, positions):
+        """Данные страницы в формате TitleReadSerializer."""
+        columns = self.columns.get()
+        ratings, _ = self.stats(columns)
+        data = catalog.get()
+        results = []
+        for position in positions:
+            title = columns.rows[position]
+            category = data.categories_by_id.get(title['category_id'])
+            rating = ratings[position]
+            results.append({
+                'id': title['id'],
+                'name': title['name'],
+                'category': (
+                    CategorySerializer(category).data if category else None
+                ),
+                'genre': GenreSerializer([
+                    data.genres_by_id[genre_id]
+                    for genre_id in title['genre_ids']
+                    if genre_id in data.genres_by_id
+                ], many=True).data,
+                'description': title['description'],
+                'year': title['year'],
+                'rating': None if np.isnan(rating) else int(rating),
+            })
+        return results
+
+
+title_snapshot = TitleSnapshot()
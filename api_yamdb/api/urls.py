@@ -2,7 +2,9 @@ from django.urls import include, path
 from rest_framework.routers import SimpleRouter
 
 from .views import (CategoryViewSet, CommentViewSet, GenreViewSet,
-                    ReviewViewSet, TitleViewSet, UserViewSet, sign_up, token)
+                    ReviewViewSet, TitleViewSet, UserViewSet, changes,
+                    moderate_comments, moderate_reviews, reviews_batch,
+                    sign_up, token)
 
 router = SimpleRouter()
 
@@ -24,4 +26,10 @@ urlpatterns = [
     path('v1/', include(router.urls)),
     path('v1/auth/signup/', sign_up, name='sign_up'),
     path('v1/auth/token/', token, name='token'),
+    path('v1/changes/', changes, name='changes'),
+    path('v1/reviews/', reviews_batch, name='reviews_batch'),
+    path('v1/moderation/reviews/', moderate_reviews,
+         name='moderate_reviews'),
+    path('v1/moderation/comments/', moderate_comments,
+         name='moderate_comments'),
 ]
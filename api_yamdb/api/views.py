@@ -1,37 +1,110 @@
 from api.permissions import (AdminUserOrReadOnly, AuthorAdminReadOnly,
-                             CommentReviewPermission, IsAdminOrSuperuser)
+                             CommentReviewPermission, IsAdminOrSuperuser,
+                             IsModeratorOrAdmin)
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
 from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
+from django_filters.utils import translate_validation
 from rest_framework import filters, status
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter
 from rest_framework.mixins import (CreateModelMixin, DestroyModelMixin,
                                    ListModelMixin)
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
 from rest_framework_simplejwt.tokens import RefreshToken
-from reviews.models import Category, Genre, Title, User
+from reviews.catalog import catalog, rating_stats, title_index
+from reviews.changes import record_changes, record_deletes, touch
+from reviews.models import (Category, Comments, Genre, RatingStats, Review,
+                            Title, TitleSimilarity, User, deleted_slug)
+from reviews.stats import (authors_deleted, comment_added, delete_comments,
+                           delete_reviews, review_added, review_score_changed)
 
-from .filters import TitleFilter
-from .serializers import (CategorySerializer, CommentSerializer,
-                          GenreSerializer, RegistrationSerializer,
-                          ReviewSerializer, TitleReadSerializer,
-                          TitleSerializer, TokenCodeSerializer,
-                          UserMeSerializer, UserSerializer)
+from .batch import batch_response, forget, parse_batch
+from .caching import CacheControlMixin
+from .facets import title_facets
+from .feed import read_changes
+from .filters import StableOrderingFilter, TitleFilter
+from .pagination import EstimatedCountPagination
+from .previews import comment_previews
+from .serializers import (MAX_MODERATION_IDS, CategorySerializer,
+                          CommentSerializer, GenreSerializer,
+                          ModerationSerializer, RatingStatsSerializer,
+                          RegistrationSerializer, ReviewSerializer,
+                          ReviewWithCommentsSerializer, SimilarTitleSerializer,
+                          TitleReadSerializer, TitleSerializer,
+                          TokenCodeSerializer, UserMeSerializer,
+                          UserSerializer)
+from .snapshot import title_snapshot
 
+CHANGES_PAGE_SIZE = 100
+MAX_CHANGES_PAGE_SIZE = 1000
 
-class UserViewSet(ModelViewSet):
-    queryset = User.objects.all()
+
+class SoftDeleteMixin:
+    """Помечает объект удалённым; зависимые данные удаляет purge_deleted."""
+
+    soft_delete_values = {'is_deleted': True}
+
+    def perform_destroy(self, instance):
+        model = type(instance)
+        with transaction.atomic():
+            model.objects.filter(pk=instance.pk).update(
+                **touch(self.soft_delete_values, model)
+            )
+            record_deletes(model, [instance.pk])
+            self.soft_deleted([instance.pk])
+
+    def soft_deleted(self, ids):
+        """Вызывается в той же транзакции после пометки объектов."""
+
+
+class UserViewSet(SoftDeleteMixin, ModelViewSet):
+    queryset = User.objects.filter(is_deleted=False)
+    query_budget = {
+        'list': 4, 'retrieve': 3, 'create': 4, 'update': 5,
+        'partial_update': 5, 'destroy': 5, 'me': 3,
+    }
     serializer_class = UserSerializer
     permission_classes = [IsAdminOrSuperuser, ]
+    pagination_class = EstimatedCountPagination
     filter_backends = (DjangoFilterBackend, filters.SearchFilter, )
     search_fields = ('username', )
     lookup_field = 'username'
+    soft_delete_values = {'is_deleted': True, 'is_active': False}
+
+    def list(self, request, *args, **kwargs):
+        if 'usernames' not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        usernames = parse_batch(
+            request.query_params['usernames'], 'usernames'
+        )
+        return batch_response('users', usernames, self.load_batch)
+
+    def load_batch(self, usernames):
+        users = self.get_queryset().filter(username__in=usernames)
+        return {
+            user.username: self.get_serializer(user).data for user in users
+        }
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        forget('users', [serializer.instance.username])
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        forget('users', [instance.username])
+
+    def soft_deleted(self, ids):
+        authors_deleted(ids)
 
     @action(
         detail=False, methods=['GET', 'PATCH'], url_path='me',
@@ -47,6 +120,7 @@ class UserViewSet(ModelViewSet):
             )
             serializer.is_valid(raise_exception=True)
             serializer.save()
+            forget('users', [request.user.username])
             return Response(serializer.data, status=status.HTTP_200_OK)
         if request.method == 'GET':
             serializer = self.get_serializer(request.user)
@@ -59,10 +133,9 @@ class UserViewSet(ModelViewSet):
 def sign_up(request):
     serializer = RegistrationSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
-    username = serializer.validated_data.get('username')
-    email = serializer.validated_data.get('email')
+    user = serializer.save()
+    email = user.email
     sending_email = settings.EMAIL
-    user, created = User.objects.get_or_create(username=username, email=email)
     confirmation_code = default_token_generator.make_token(user)
     message = f'Ваш код: {confirmation_code}'
     send_mail(
@@ -75,6 +148,69 @@ def sign_up(request):
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+def moderate(request, queryset, delete):
+    """Удаляет не больше MAX_MODERATION_IDS самых старых объектов.
+
+    Выборка по автору сама ничем не ограничена, поэтому за запрос
+    удаляется одна пачка; has_more говорит, что нужно повторить запрос.
+    """
+    serializer = ModerationSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ids = list(
+        serializer.filter_queryset(queryset).order_by('pk')
+        .values_list('pk', flat=True)[:MAX_MODERATION_IDS + 1]
+    )
+    queryset = queryset.filter(pk__in=ids[:MAX_MODERATION_IDS])
+    with transaction.atomic():
+        if queryset.model is Review:
+            forget('reviews', queryset.values_list('pk', flat=True))
+        deleted = delete(queryset)
+    return Response(
+        {'deleted': deleted, 'has_more': len(ids) > MAX_MODERATION_IDS},
+        status=status.HTTP_200_OK
+    )
+
+
+@api_view(['POST'])
+@permission_classes([IsModeratorOrAdmin])
+def moderate_reviews(request):
+    return moderate(request, Review.objects.all(), delete_reviews)
+
+
+@api_view(['POST'])
+@permission_classes([IsModeratorOrAdmin])
+def moderate_comments(request):
+    return moderate(request, Comments.objects.all(), delete_comments)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def reviews_batch(request):
+    ids = parse_batch(request.query_params.get('ids', ''), 'ids', int)
+
+    def load(ids):
+        reviews = Review.objects.filter(
+            pk__in=ids, title__is_deleted=False, author__is_deleted=False
+        ).select_related('author', 'title')
+        return {
+            review.pk: ReviewSerializer(review).data for review in reviews
+        }
+
+    return batch_response('reviews', ids, load)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminOrSuperuser])
+def changes(request):
+    since = request.query_params.get('since', '0')
+    limit = request.query_params.get('limit', str(CHANGES_PAGE_SIZE))
+    if not since.isdigit() or not limit.isdigit():
+        raise ValidationError('since и limit должны быть целыми числами.')
+    return Response(
+        read_changes(int(since), min(int(limit), MAX_CHANGES_PAGE_SIZE))
+    )
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def token(request):
@@ -97,66 +233,325 @@ def token(request):
         status=status.HTTP_200_OK)
 
 
-class CategoryViewSet(CreateModelMixin, ListModelMixin,
+class CatalogViewSetMixin:
+    """Список без поиска отдаётся из каталога в памяти процесса."""
+
+    catalog_attr = None
+    stats_dimension = None
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get(api_settings.SEARCH_PARAM):
+            return super().list(request, *args, **kwargs)
+        objects = getattr(catalog.get(), self.catalog_attr)
+        page = self.paginate_queryset(objects)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(objects, many=True)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['GET'])
+    def stats(self, request, slug=None):
+        """Сводка оценок из таблицы RatingStats, без запросов к базе."""
+        obj = catalog.slug_map(self.queryset.model).get(slug)
+        if obj is None:
+            raise Http404
+        return Response(RatingStatsSerializer(
+            rating_stats.lookup(self.stats_dimension, obj.pk)
+        ).data)
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            super().perform_create(serializer)
+            record_changes(serializer.Meta.model, [serializer.instance.pk])
+        catalog.invalidate()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        catalog.invalidate()
+
+
+class CategoryViewSet(CacheControlMixin, CatalogViewSetMixin,
+                      SoftDeleteMixin, CreateModelMixin, ListModelMixin,
                       DestroyModelMixin, GenericViewSet):
-    queryset = Category.objects.all().order_by('name')
+    queryset = Category.objects.filter(is_deleted=False).order_by('name')
     serializer_class = CategorySerializer
     permission_classes = [AuthorAdminReadOnly, ]
     filter_backends = (SearchFilter, )
     search_fields = ('name', 'slug')
     lookup_field = 'slug'
+    catalog_attr = 'categories'
+    stats_dimension = RatingStats.CATEGORY
+    query_budget = {'list': 2, 'stats': 3, 'create': 6, 'destroy': 6}
+    soft_delete_values = {'is_deleted': True, 'slug': deleted_slug()}
 
 
-class GenreViewSet(CreateModelMixin, ListModelMixin,
-                   DestroyModelMixin, GenericViewSet):
+class GenreViewSet(CacheControlMixin, CatalogViewSetMixin, CreateModelMixin,
+                   ListModelMixin, DestroyModelMixin, GenericViewSet):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = [AdminUserOrReadOnly, ]
     filter_backends = (SearchFilter,)
     search_fields = ('name',)
     lookup_field = 'slug'
+    catalog_attr = 'genres'
+    stats_dimension = RatingStats.GENRE
+    query_budget = {'list': 2, 'stats': 3, 'create': 6, 'destroy': 8}
 
+    def perform_destroy(self, instance):
+        genre_id = instance.pk
+        with transaction.atomic():
+            title_ids = list(
+                Title.objects.filter(genre=instance)
+                .values_list('pk', flat=True)
+            )
+            super().perform_destroy(instance)
+            record_deletes(Genre, [genre_id])
+            Title.objects.filter(pk__in=title_ids).update(
+                updated_at=timezone.now()
+            )
+            record_changes(Title, title_ids)
 
-class TitleViewSet(ModelViewSet):
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')
-    ).all()
+
+class TitleViewSet(CacheControlMixin, SoftDeleteMixin, ModelViewSet):
+    queryset = Title.objects.filter(is_deleted=False)
     serializer_class = TitleSerializer
     permission_classes = [AdminUserOrReadOnly, ]
-    filter_backends = (DjangoFilterBackend,)
+    pagination_class = EstimatedCountPagination
+    filter_backends = (DjangoFilterBackend, StableOrderingFilter)
     filterset_class = TitleFilter
+    ordering_fields = ('rating', 'year', 'name', 'reviews_count')
+    ordering = ('id',)
+    lookup_value_regex = r'\d+'
+    similar_limit = 10
+    suggest_limit = 10
+    query_budget = {
+        'list': 9, 'retrieve': 5, 'similar': 3, 'suggest': 1,
+        'year_stats': 1, 'create': 10, 'update': 10, 'partial_update': 10,
+        'destroy': 6,
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('retrieve', 'list'):
+            return queryset.prefetch_related('genretitle_set')
+        return queryset
 
     def get_serializer_class(self):
         if self.action in ('retrieve', 'list'):
             return TitleReadSerializer
         return TitleSerializer
 
+    def list(self, request, *args, **kwargs):
+        if 'ids' in request.query_params:
+            ids = parse_batch(request.query_params['ids'], 'ids', int)
+            return batch_response('titles', ids, self.load_batch)
+        with_facets = request.query_params.get('facets') in ('1', 'true')
+        if settings.CATALOG_SNAPSHOT and not with_facets:
+            return self.snapshot_list(request)
+        response = super().list(request, *args, **kwargs)
+        if with_facets:
+            response.data['facets'] = title_facets(
+                self.filter_queryset(Title.objects.filter(is_deleted=False)),
+                request.query_params
+            )
+        return response
 
-class ReviewViewSet(ModelViewSet):
+    def snapshot_list(self, request):
+        """Список из снимка каталога в памяти, без запросов к базе."""
+        queryset = Title.objects.none()
+        filterset = TitleFilter(
+            request.query_params, queryset=queryset, request=request
+        )
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        ordering = StableOrderingFilter().get_ordering(
+            request, queryset, self
+        )
+        positions = title_snapshot.select(
+            filterset.form.cleaned_data, ordering
+        )
+        page = self.paginate_queryset(positions)
+        if page is None:
+            return Response(title_snapshot.render(positions))
+        return self.get_paginated_response(title_snapshot.render(page))
+
+    def load_batch(self, ids):
+        titles = list(self.get_queryset().filter(pk__in=ids))
+        return {
+            title.pk: data for title, data in zip(
+                titles, self.get_serializer(titles, many=True).data
+            )
+        }
+
+    @action(detail=True, methods=['GET'])
+    def similar(self, request, pk=None):
+        title = self.get_object()
+        similarities = (
+            TitleSimilarity.objects
+            .filter(title=title, similar__is_deleted=False)
+            .select_related('similar')
+            .order_by('-score')[:self.similar_limit]
+        )
+        serializer = SimilarTitleSerializer(similarities, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['GET'])
+    def suggest(self, request):
+        limit = self.suggest_limit
+        if request.query_params.get('limit', '').isdigit():
+            limit = min(int(request.query_params['limit']), limit)
+        return Response(
+            title_index.search(request.query_params.get('q', ''), limit)
+        )
+
+    @action(
+        detail=False, methods=['GET'],
+        url_path=r'years/(?P<year>\d+)/stats'
+    )
+    def year_stats(self, request, year):
+        return Response(RatingStatsSerializer(
+            rating_stats.lookup(RatingStats.YEAR, int(year))
+        ).data)
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            super().perform_create(serializer)
+            titles = serializer.instance
+            if not isinstance(titles, list):
+                titles = [titles]
+            record_changes(Title, [title.pk for title in titles])
+        title_index.invalidate()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            super().perform_update(serializer)
+            record_changes(Title, [serializer.instance.pk])
+        title_index.invalidate()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        title_index.invalidate()
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class ReviewViewSet(CacheControlMixin, ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = [CommentReviewPermission, ]
+    pagination_class = EstimatedCountPagination
+    max_comments_preview = 10
+    query_budget = {
+        'list': 5, 'retrieve': 3, 'create': 10, 'update': 9,
+        'partial_update': 9, 'destroy': 13,
+    }
 
     def get_queryset(self):
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
-        return title.reviews.all()
+        title = get_object_or_404(
+            Title, id=self.kwargs.get('title_id'), is_deleted=False
+        )
+        return (
+            title.reviews.filter(author__is_deleted=False)
+            .select_related('author', 'title')
+        )
+
+    def list(self, request, *args, **kwargs):
+        limit = self.get_comments_preview()
+        if not limit:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        reviews = list(queryset if page is None else page)
+        context = self.get_serializer_context()
+        context['comment_previews'] = comment_previews(
+            [review.pk for review in reviews], limit
+        )
+        serializer = ReviewWithCommentsSerializer(
+            reviews, many=True, context=context
+        )
+        if page is None:
+            return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
+
+    def get_comments_preview(self):
+        value = self.request.query_params.get('comments_preview')
+        if not value:
+            return 0
+        if not value.isdigit():
+            raise ValidationError(
+                {'comments_preview': ['Введите целое число.']}
+            )
+        return min(int(value), self.max_comments_preview)
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user, title=title)
+        title = get_object_or_404(
+            Title, id=self.kwargs.get('title_id'), is_deleted=False
+        )
+        with transaction.atomic():
+            review = serializer.save(author=self.request.user, title=title)
+            review_added(review)
+            record_changes(Review, [review.pk])
+
+    def perform_update(self, serializer):
+        old_score = serializer.instance.score
+        with transaction.atomic():
+            review_score_changed(serializer.save(), old_score)
+            record_changes(Review, [serializer.instance.pk])
+            forget('reviews', [serializer.instance.pk])
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            forget('reviews', [instance.pk])
+            delete_reviews(Review.objects.filter(pk=instance.pk))
 
-class CommentViewSet(ModelViewSet):
+
+class CommentViewSet(CacheControlMixin, ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = [CommentReviewPermission, ]
+    query_budget = {
+        'list': 5, 'retrieve': 4, 'create': 8, 'update': 8,
+        'partial_update': 8, 'destroy': 10,
+    }
 
     def get_queryset(self):
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
+        title = get_object_or_404(
+            Title, id=self.kwargs.get('title_id'), is_deleted=False
+        )
         review = get_object_or_404(
             title.reviews, id=self.kwargs.get('review_id'))
-        return review.comments.all()
+        comments = (
+            review.comments.filter(author__is_deleted=False)
+            .select_related('author')
+        )
+        after = self.request.query_params.get('after')
+        if self.action != 'list' or after is None:
+            return comments
+        if not after.isdigit():
+            raise ValidationError({'after': ['Введите целое число.']})
+        return comments.filter(pk__gt=int(after)).order_by('pk')
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
+        title = get_object_or_404(
+            Title, id=self.kwargs.get('title_id'), is_deleted=False
+        )
         review = get_object_or_404(
             title.reviews, id=self.kwargs.get('review_id'))
-        serializer.save(author=self.request.user, review=review)
+        with transaction.atomic():
+            comment = serializer.save(author=self.request.user, review=review)
+            comment_added(comment)
+            record_changes(Comments, [comment.pk])
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+            record_changes(Comments, [serializer.instance.pk])
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            delete_comments(Comments.objects.filter(pk=instance.pk))
@@ -26,14 +26,22 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.ProfilerMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ReplicaMiddleware',
 ]
 
+# Учёт SQL-запросов по бюджетам вьюсетов: '', 'warn' или 'raise'.
+QUERY_BUDGET = os.getenv('QUERY_BUDGET', default='')
+
+if QUERY_BUDGET:
+    MIDDLEWARE.insert(1, 'api.middleware.QueryBudgetMiddleware')
+
 ROOT_URLCONF = 'api_yamdb.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
@@ -67,6 +75,56 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения: хосты Postgres (или файлы SQLite) через запятую.
+for number, replica in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', default='').split(','))):
+    location = ('NAME' if 'sqlite3' in DATABASES['default']['ENGINE']
+                else 'HOST')
+    DATABASES[f'replica_{number}'] = dict(
+        DATABASES['default'],
+        **{location: replica},
+        TEST={'MIRROR': 'default'}
+    )
+
+DATABASE_ROUTERS = ['api.db_routers.ReplicaRouter']
+
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', default=5))
+
+REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', default=5))
+
+REPLICA_LAG_CHECK = float(os.getenv('REPLICA_LAG_CHECK', default=1))
+
+
+# Список произведений из колоночного снимка в памяти (см. api/snapshot.py).
+CATALOG_SNAPSHOT = os.getenv('CATALOG_SNAPSHOT', default='') == '1'
+
+# ASGI-режим (api/asgi.py): размер пула потоков для Django и long-polling
+# комментариев: как часто проверять новые и сколько секунд ждать максимум.
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', default=8))
+
+LONG_POLL_INTERVAL = float(os.getenv('LONG_POLL_INTERVAL', default=1))
+
+LONG_POLL_MAX_WAIT = int(os.getenv('LONG_POLL_MAX_WAIT', default=30))
+
+# Кэш, общий для всех процессов и контейнеров: в нём хранятся версии
+# данных, закэшированных в памяти процессов (см. reviews/catalog.py).
+# Файловый кэш по умолчанию годится только для запуска в одном контейнере,
+# в docker-compose используется memcached.
+CACHE_BACKEND = os.getenv(
+    'CACHE_BACKEND',
+    default='django.core.cache.backends.filebased.FileBasedCache'
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', default='/var/tmp/api_yamdb'),
+    }
+}
+
+if 'memcached' not in CACHE_BACKEND:
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': 10000}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
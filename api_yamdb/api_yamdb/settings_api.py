@@ -0,0 +1,50 @@
+"""Профиль только для API: без админки, сессий, сообщений и CSRF.
+
+API аутентифицирует только по JWT, поэтому сессии, сообщения и защита
+от CSRF/clickjacking на этих воркерах не нужны. Админка и статика
+обслуживаются отдельным сервисом с обычными настройками (settings.py).
+Включается через DJANGO_SETTINGS_MODULE=api_yamdb.settings_api.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK, TEMPLATES
+
+EXCLUDED_APPS = (
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+)
+
+EXCLUDED_MIDDLEWARE = (
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+)
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in EXCLUDED_APPS]
+
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if middleware not in EXCLUDED_MIDDLEWARE
+]
+
+ROOT_URLCONF = 'api_yamdb.urls_api'
+
+TEMPLATES = [
+    dict(
+        TEMPLATES[0],
+        OPTIONS={
+            'context_processors': [
+                'django.template.context_processors.request',
+            ],
+        },
+    )
+]
+
+# Браузерный интерфейс DRF рассчитан на сессии; здесь отдаём только JSON.
+REST_FRAMEWORK = dict(
+    REST_FRAMEWORK,
+    DEFAULT_RENDERER_CLASSES=['rest_framework.renderers.JSONRenderer'],
+)
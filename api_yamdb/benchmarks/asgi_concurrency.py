@@ -0,0 +1,172 @@
+"""gunicorn (sync) против ASGI-режима при множестве простаивающих соединений.
+
+Сервер запускается отдельным процессом. Бенчмарк открывает --connections
+соединений, которые ничего не делают: медленные клиенты, не дославшие
+заголовки (--scenario slow), или long-polling новых комментариев
+(--scenario long-poll, в WSGI параметр wait игнорируется). Пока они
+открыты, измеряется задержка обычных запросов и прирост памяти
+процессов сервера на одно соединение. Запуск из каталога api_yamdb:
+
+    python benchmarks/asgi_concurrency.py --connections 500 --workers 2
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import time
+
+SERVERS = {
+    'gunicorn-sync': [
+        'gunicorn', 'api_yamdb.wsgi:application',
+        '--bind', '127.0.0.1:{port}', '--workers', '{workers}',
+    ],
+    'uvicorn-asgi': [
+        'uvicorn', 'api_yamdb.asgi:application',
+        '--port', '{port}', '--workers', '{workers}',
+        '--log-level', 'warning',
+    ],
+}
+PROBE_TIMEOUT = 5
+
+
+def rss_kb(pid):
+    """Суммарная резидентная память процесса и его потомков (Linux)."""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as stat:
+                parent = int(stat.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, []))
+        try:
+            with open(f'/proc/{current}/status') as status:
+                for line in status:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+        except OSError:
+            continue
+    return total
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), 1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Сервер не запустился на порту {port}')
+
+
+async def hold(port, request):
+    """Открывает соединение, отправляет начало запроса и молчит."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(request)
+    await writer.drain()
+    return reader, writer
+
+
+async def probe(port, path):
+    started = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection('127.0.0.1', port), PROBE_TIMEOUT
+        )
+        writer.write(
+            f'GET {path} HTTP/1.1\r\nHost: localhost\r\n'
+            'Connection: close\r\n\r\n'.encode()
+        )
+        await asyncio.wait_for(reader.read(), PROBE_TIMEOUT)
+        writer.close()
+    except (asyncio.TimeoutError, OSError):
+        return None
+    return time.perf_counter() - started
+
+
+async def run_scenario(pid, port, options):
+    if options.scenario == 'slow':
+        request = b'GET /api/v1/titles/ HTTP/1.1\r\nHost: localhost\r\n'
+    else:
+        request = (
+            f'GET {options.comments}?after={2 ** 31 - 1}&wait=60 HTTP/1.1'
+            '\r\nHost: localhost\r\n\r\n'.encode()
+        )
+    before = rss_kb(pid)
+    connections = await asyncio.gather(
+        *(hold(port, request) for _ in range(options.connections)),
+        return_exceptions=True
+    )
+    opened = [item for item in connections if isinstance(item, tuple)]
+    await asyncio.sleep(1)
+    after = rss_kb(pid)
+    latencies = [
+        await probe(port, options.path) for _ in range(options.probes)
+    ]
+    for _, writer in opened:
+        writer.close()
+    served = [latency for latency in latencies if latency is not None]
+    return {
+        'opened': len(opened),
+        'per_connection_kb': (after - before) / max(len(opened), 1),
+        'served': len(served),
+        'median_ms': statistics.median(served) * 1000 if served else None,
+    }
+
+
+def measure(name, options):
+    port = options.port
+    command = [
+        part.format(port=port, workers=options.workers)
+        for part in SERVERS[name]
+    ]
+    server = subprocess.Popen(
+        command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    try:
+        wait_for_port(port)
+        asyncio.run(probe(port, options.path))
+        return asyncio.run(run_scenario(server.pid, port, options))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--connections', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--probes', type=int, default=10)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--path', default='/api/v1/titles/')
+    parser.add_argument(
+        '--scenario', choices=('slow', 'long-poll'), default='slow'
+    )
+    parser.add_argument(
+        '--comments', default='/api/v1/titles/1/reviews/1/comments/',
+        help='Comments list used by the long-poll scenario'
+    )
+    options = parser.parse_args()
+    for name in SERVERS:
+        result = measure(name, options)
+        median = result['median_ms']
+        print(
+            f'{name:<14} open {result["opened"]:>5}  '
+            f'memory {result["per_connection_kb"]:.1f} KB/conn  '
+            f'probes {result["served"]}/{options.probes}  '
+            f'latency {"—" if median is None else f"{median:.1f} ms"}'
+        )
+
+
+if __name__ == '__main__':
+    main()
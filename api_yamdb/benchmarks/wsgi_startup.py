@@ -0,0 +1,76 @@
+"""Сравнение профилей настроек: время импорта wsgi.py и цена запроса.
+
+Каждый замер выполняется в отдельном процессе, чтобы импорт начинался
+с холодного состояния. Запуск из каталога api_yamdb:
+
+    python benchmarks/wsgi_startup.py --runs 10 --requests 2000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROFILES = ('api_yamdb.settings', 'api_yamdb.settings_api')
+
+CHILD = '''
+import json, sys, time
+from wsgiref.util import setup_testing_defaults
+started = time.perf_counter()
+from api_yamdb.wsgi import application
+imported = time.perf_counter() - started
+path, count = sys.argv[1], int(sys.argv[2])
+
+def call():
+    environ = {'PATH_INFO': path, 'REQUEST_METHOD': 'GET'}
+    setup_testing_defaults(environ)
+    status = []
+    body = application(environ, lambda code, headers: status.append(code))
+    b''.join(body)
+    body.close()
+    return status[0]
+
+first = call()
+started = time.perf_counter()
+for _ in range(count):
+    call()
+per_request = (time.perf_counter() - started) / count if count else 0
+print(json.dumps({'import': imported, 'request': per_request,
+                  'status': first}))
+'''
+
+
+def measure(settings_module, path, requests):
+    environ = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, path, str(requests)],
+        env=environ, check=True, stdout=subprocess.PIPE,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ).stdout
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--path', default='/api/v1/categories/')
+    options = parser.parse_args()
+    for settings_module in PROFILES:
+        results = [
+            measure(settings_module, options.path, options.requests)
+            for _ in range(options.runs)
+        ]
+        print(
+            f'{settings_module:<24} '
+            f'status {results[0]["status"]}  '
+            'import {:.1f} ms  request {:.1f} us'.format(
+                statistics.median(r['import'] for r in results) * 1000,
+                statistics.median(r['request'] for r in results) * 1e6,
+            )
+        )
+
+
+if __name__ == '__main__':
+    main()
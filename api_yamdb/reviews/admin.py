@@ -1,11 +1,66 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.db import transaction
+from django.utils import timezone
 
-from .models import Category, Comments, Genre, Review, Title, User
+from .catalog import catalog, title_index
+from .changes import record_changes, record_deletes, touch
+from .models import (Category, Comments, Genre, Review, Title, User,
+                     deleted_slug)
+from .pagination import EstimatedCountPaginator
+from .stats import (authors_deleted, delete_comments, delete_reviews,
+                    refresh_title_stats, refresh_user_stats)
+
+
+class SoftDeleteAdminMixin:
+    """Удаление в админке помечает объекты удалёнными, как и API.
+
+    Отзывы, комментарии и связи удалённых объектов затем удаляет
+    purge_deleted через reviews.stats: пересчитываются счётчики авторов
+    и рейтинги, в журнал пишутся удаления. Каскад Django это обходит.
+    """
+
+    soft_delete_values = {'is_deleted': True}
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(is_deleted=False)
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, type(obj).objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        model = queryset.model
+        with transaction.atomic():
+            ids = list(queryset.values_list('pk', flat=True))
+            model.objects.filter(pk__in=ids).update(
+                **touch(self.soft_delete_values, model)
+            )
+            record_deletes(model, ids)
+            self.soft_deleted(ids)
+
+    def soft_deleted(self, ids):
+        """Вызывается в той же транзакции после пометки объектов."""
+
+
+class CatalogAdminMixin:
+    versioned_cache = catalog
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        record_changes(type(obj), [obj.pk])
+        self.versioned_cache.invalidate()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.versioned_cache.invalidate()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        self.versioned_cache.invalidate()
 
 
 @admin.register(Genre)
-class GenreAdmin(admin.ModelAdmin):
+class GenreAdmin(CatalogAdminMixin, admin.ModelAdmin):
     list_display = (
         'id',
         'name',
@@ -15,9 +70,28 @@ class GenreAdmin(admin.ModelAdmin):
     list_filter = ('name',)
     empty_value_display = '-пусто-'
 
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, Genre.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        """Жанры удаляются сразу; их произведения попадают в журнал."""
+        with transaction.atomic():
+            ids = list(queryset.values_list('pk', flat=True))
+            title_ids = list(
+                Title.objects.filter(genre__in=ids)
+                .values_list('pk', flat=True).distinct()
+            )
+            super().delete_queryset(request, Genre.objects.filter(pk__in=ids))
+            record_deletes(Genre, ids)
+            Title.objects.filter(pk__in=title_ids).update(
+                updated_at=timezone.now()
+            )
+            record_changes(Title, title_ids)
+
 
 @admin.register(Category)
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(CatalogAdminMixin, SoftDeleteAdminMixin, admin.ModelAdmin):
+    soft_delete_values = {'is_deleted': True, 'slug': deleted_slug()}
     list_display = (
         'id',
         'name',
@@ -29,7 +103,8 @@ class CategoryAdmin(admin.ModelAdmin):
 
 
 @admin.register(Title)
-class TitleAdmin(admin.ModelAdmin):
+class TitleAdmin(CatalogAdminMixin, SoftDeleteAdminMixin, admin.ModelAdmin):
+    versioned_cache = title_index
     list_display = (
         'id',
         'name',
@@ -42,8 +117,34 @@ class TitleAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список без точного COUNT(*) по всей таблице."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    date_hierarchy = 'pub_date'
+
+
+class AuthorStatsAdminMixin:
+    """Поддерживает счётчики авторов при правке и удалении в админке."""
+
+    bulk_delete = None
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        record_changes(type(obj), [obj.pk])
+        authors = {obj.author_id, form.initial.get('author')}
+        refresh_user_stats(authors - {None})
+
+    def delete_model(self, request, obj):
+        self.bulk_delete(type(obj).objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        self.bulk_delete(queryset)
+
+
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(AuthorStatsAdminMixin, LargeTableAdmin):
     list_display = (
         'id',
         'title',
@@ -52,17 +153,24 @@ class ReviewAdmin(admin.ModelAdmin):
         'score',
         'pub_date'
     )
+    list_select_related = ('title', 'author')
+    bulk_delete = staticmethod(delete_reviews)
+    autocomplete_fields = ('title', 'author')
     search_fields = (
-        'title',
-        'author',
-        'pub_date'
+        'title__name',
+        '^author__username',
     )
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        titles = {obj.title_id, form.initial.get('title')}
+        refresh_title_stats(titles - {None})
+
 
 @admin.register(Comments)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(AuthorStatsAdminMixin, LargeTableAdmin):
     list_display = (
         'id',
         'review',
@@ -70,13 +178,21 @@ class CommentAdmin(admin.ModelAdmin):
         'author',
         'pub_date',
     )
+    list_select_related = ('review', 'author')
+    bulk_delete = staticmethod(delete_comments)
+    autocomplete_fields = ('review', 'author')
     search_fields = (
-        'review',
-        'author',
-        'pub_date'
+        'review__title__name',
+        '^author__username',
     )
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
 
-admin.site.register(User, UserAdmin)
+@admin.register(User)
+class YamdbUserAdmin(SoftDeleteAdminMixin, UserAdmin):
+    search_fields = ('^username', '^email')
+    soft_delete_values = {'is_deleted': True, 'is_active': False}
+
+    def soft_deleted(self, ids):
+        authors_deleted(ids)
@@ -0,0 +1,197 @@
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Category, Genre, RatingStats, Title
+
+VERSION_KEY_PREFIX = 'version:'
+
+
+def get_version(name):
+    """Текущая версия данных, общая для всех процессов."""
+    key = VERSION_KEY_PREFIX + name
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, None)
+        return cache.get(key)
+    return version
+
+
+def bump_version(name):
+    cache.set(VERSION_KEY_PREFIX + name, uuid4().hex, None)
+
+
+class VersionedCache(ABC):
+    """Данные в памяти процесса, которые перечитываются при смене версии.
+
+    Версия хранится в общем кэше Django и меняется после коммита
+    транзакции, изменившей данные. Процесс сверяет версию не чаще,
+    чем раз в ``check_interval`` секунд.
+
+    ``load`` читает только с основной базы: данные перечитываются сразу
+    после смены версии, и отстающая реплика закэшировала бы под новой
+    версией старое состояние.
+    """
+
+    version_key = None
+    check_interval = 1
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._version = None
+        self._checked_at = 0
+
+    @abstractmethod
+    def load(self):
+        """Читает данные из базы; вызывается при смене версии."""
+
+    def current_version(self):
+        return get_version(self.version_key)
+
+    def get(self):
+        now = time.monotonic()
+        data = self._data
+        if data is not None and now - self._checked_at < self.check_interval:
+            return data
+        with self._lock:
+            version = self.current_version()
+            if self._data is None or version != self._version:
+                self._data = self.load()
+                self._version = version
+            self._checked_at = now
+            return self._data
+
+    def invalidate(self):
+        transaction.on_commit(self._bump)
+
+    def _bump(self):
+        bump_version(self.version_key)
+        self._data = None
+
+
+class CatalogData:
+    def __init__(self, categories, genres):
+        self.categories = categories
+        self.genres = genres
+        self.categories_by_id = {obj.pk: obj for obj in categories}
+        self.genres_by_id = {obj.pk: obj for obj in genres}
+        self.slug_maps = {
+            Category: {obj.slug: obj for obj in categories},
+            Genre: {obj.slug: obj for obj in genres},
+        }
+
+
+class Catalog(VersionedCache):
+    """Все категории и жанры: таблицы маленькие и меняются редко."""
+
+    version_key = 'catalog'
+
+    def load(self):
+        return CatalogData(
+            categories=list(
+                Category.objects.using(DEFAULT_DB_ALIAS)
+                .filter(is_deleted=False).order_by('name')
+            ),
+            genres=list(
+                Genre.objects.using(DEFAULT_DB_ALIAS).order_by('pk')
+            ),
+        )
+
+    def slug_map(self, model):
+        if model not in (Category, Genre):
+            return None
+        return self.get().slug_maps[model]
+
+
+catalog = Catalog()
+
+
+def normalize(text):
+    """Регистр и «ё» не различаются: «Ёлка» и «елка» совпадают."""
+    return text.casefold().replace('ё', 'е')
+
+
+WORD_START = re.compile(r'\b\w')
+
+
+class TitleIndexData:
+    """Отсортированные ключи-префиксы названий и соответствующие id.
+
+    Для каждого названия хранится ключ с начала каждого слова, поэтому
+    «Властелин колец» находится и по «власт», и по «кол».
+    """
+
+    def __init__(self, titles):
+        self.titles = {title['id']: title for title in titles}
+        entries = sorted(
+            (normalized[match.start():], title['id'])
+            for title in titles
+            for normalized in [normalize(title['name'])]
+            for match in WORD_START.finditer(normalized)
+        )
+        self.keys = [key for key, _ in entries]
+        self.ids = [pk for _, pk in entries]
+
+    def search(self, query, limit):
+        query = normalize(query.strip())
+        found = []
+        if not query:
+            return found
+        position = bisect_left(self.keys, query)
+        while (position < len(self.keys) and len(found) < limit
+               and self.keys[position].startswith(query)):
+            title = self.titles[self.ids[position]]
+            if title not in found:
+                found.append(title)
+            position += 1
+        return found
+
+
+class TitleIndex(VersionedCache):
+    """Префиксный индекс названий для подсказок при вводе."""
+
+    version_key = 'titles'
+
+    def load(self):
+        return TitleIndexData(list(
+            Title.objects.using(DEFAULT_DB_ALIAS).filter(is_deleted=False)
+            .values('id', 'name', 'year')
+        ))
+
+    def search(self, query, limit=10):
+        return self.get().search(query, limit)
+
+
+title_index = TitleIndex()
+
+
+class RatingStatsCache(VersionedCache):
+    """Таблица RatingStats целиком: в ней по строке на категорию, жанр и год.
+
+    Версию меняет команда build_rating_stats после пересчёта.
+    """
+
+    version_key = 'rating-stats'
+
+    def load(self):
+        return {
+            (stats.dimension, stats.key): stats
+            for stats in RatingStats.objects.using(DEFAULT_DB_ALIAS).all()
+        }
+
+    def lookup(self, dimension, key):
+        """Сводка группы; у группы без отзывов она пустая."""
+        stats = self.get().get((dimension, key))
+        if stats is None:
+            return RatingStats(dimension=dimension, key=key)
+        return stats
+
+
+rating_stats = RatingStatsCache()
@@ -0,0 +1,71 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Max, Min
+from django.utils import timezone
+
+from .models import ChangeLog
+
+TRACKED_MODELS = {name for name, _ in ChangeLog.MODEL_CHOICES}
+SEQUENCER_LOCK = 0x79616d6462
+
+
+def is_tracked(model):
+    return model._meta.model_name in TRACKED_MODELS
+
+
+def record_changes(model, ids, operation=ChangeLog.UPSERT):
+    """Пишет изменения объектов в журнал; вызывается в той же транзакции.
+
+    Модели вне журнала (например, User) пропускаются.
+    """
+    if not is_tracked(model):
+        return
+    ChangeLog.objects.bulk_create(
+        ChangeLog(
+            model=model._meta.model_name,
+            object_id=pk,
+            operation=operation,
+        )
+        for pk in ids
+    )
+
+
+def record_deletes(model, ids):
+    record_changes(model, ids, ChangeLog.DELETE)
+
+
+def touch(values, model):
+    """Добавляет updated_at к значениям для QuerySet.update()."""
+    if is_tracked(model):
+        return dict(values, updated_at=timezone.now())
+    return values
+
+
+def sequence_changes():
+    """Нумерует закоммиченные записи журнала, у которых ещё нет seq.
+
+    Запись незавершённой транзакции здесь не видна и получит номер
+    позже, больший всех уже выданных: курсор по seq ничего не пропускает,
+    сколько бы ни шла транзакция. Нумерующие сериализуются блокировкой;
+    без неё (не Postgres) проигравший получает IntegrityError и выходит.
+    """
+    try:
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT pg_advisory_xact_lock(%s)', [SEQUENCER_LOCK]
+                    )
+            pending = ChangeLog.objects.filter(seq__isnull=True).aggregate(
+                first=Min('pk'), last=Max('pk')
+            )
+            if pending['first'] is None:
+                return
+            last_seq = ChangeLog.objects.aggregate(
+                last_seq=Max('seq')
+            )['last_seq'] or 0
+            ChangeLog.objects.filter(
+                seq__isnull=True,
+                pk__gte=pending['first'], pk__lte=pending['last'],
+            ).update(seq=F('pk') + (last_seq + 1 - pending['first']))
+    except IntegrityError:
+        return
@@ -0,0 +1,218 @@
+import time
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Q
+from reviews.catalog import rating_stats
+from reviews.changes import sequence_changes
+from reviews.models import (ChangeLog, GenreTitle, RatingStats, Review, Title,
+                            Watermark)
+
+WATERMARK = 'rating_stats'
+GROUP = ['dimension', 'key']
+PARTIALS = ['count', 'total', 'squares']
+
+
+def title_partials(rows):
+    """Число оценок, их сумма и сумма квадратов по произведениям пачки."""
+    frame = pd.DataFrame.from_records(
+        rows, columns=['title', 'score']
+    ).astype(np.int64)
+    frame['squares'] = frame['score'] * frame['score']
+    return frame.groupby('title').agg(
+        count=('score', 'size'),
+        total=('score', 'sum'),
+        squares=('squares', 'sum'),
+    )
+
+
+def combine(parts):
+    if not parts:
+        return pd.DataFrame(
+            columns=PARTIALS, dtype=np.int64,
+            index=pd.Index([], name='title', dtype=np.int64),
+        )
+    return pd.concat(parts).groupby(level=0).sum()
+
+
+def group_stats(partials, memberships):
+    """Сводка по группам из частичных сумм произведений.
+
+    Суммы складываются, поэтому произведение из нескольких жанров
+    учитывается в каждом из них. Дисперсия — генеральная:
+    E[x²] − (E[x])².
+    """
+    grouped = memberships.merge(
+        partials, left_on='title', right_index=True
+    ).groupby(GROUP)[PARTIALS].sum()
+    average = grouped['total'] / grouped['count']
+    variance = (grouped['squares'] / grouped['count'] - average ** 2)
+    return pd.DataFrame({
+        'reviews_count': grouped['count'],
+        'average': average,
+        'variance': variance.clip(lower=0),
+    }).reset_index()
+
+
+class Command(BaseCommand):
+    help = ('Builds rating statistics per category, genre and year; '
+            'refreshes incrementally from the change log')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=100000)
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Rebuild all groups instead of the changed ones'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help='Run forever, refreshing every INTERVAL seconds'
+        )
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            self.refresh(options['chunk_size'], full)
+            if options['interval'] is None:
+                return
+            full = False
+            time.sleep(options['interval'])
+
+    def refresh(self, chunk_size, full):
+        last_id = self.last_visible_change()
+        watermark = Watermark.objects.filter(name=WATERMARK).values_list(
+            'value', flat=True
+        ).first()
+        memberships = self.memberships()
+        dirty = None
+        if watermark is not None and not full:
+            dirty = self.dirty_groups(memberships, watermark, last_id)
+            if dirty.empty:
+                self.save_watermark(last_id)
+                return
+            memberships = memberships.merge(dirty, on=GROUP)
+
+        partials = self.partials(
+            memberships['title'].unique(), chunk_size, dirty is None
+        )
+        stats = group_stats(partials, memberships)
+        self.save(stats, dirty, last_id)
+        self.stdout.write(f'Пересчитано групп: {len(stats)}')
+
+    def save_watermark(self, last_id):
+        Watermark.objects.update_or_create(
+            name=WATERMARK, defaults={'value': last_id}
+        )
+
+    def last_visible_change(self):
+        """Курсор журнала в порядке коммитов, как у /changes/."""
+        sequence_changes()
+        return ChangeLog.objects.aggregate(
+            last_seq=Max('seq')
+        )['last_seq'] or 0
+
+    def memberships(self):
+        """Пары «произведение — группа» с числом отзывов произведения."""
+        titles = pd.DataFrame.from_records(
+            Title.objects.filter(is_deleted=False)
+            .values_list('pk', 'category_id', 'year', 'reviews_count'),
+            columns=['title', 'category', 'year', 'reviews_count'],
+        )
+        genres = pd.DataFrame.from_records(
+            GenreTitle.objects.filter(title__is_deleted=False)
+            .values_list('title_id', 'genre_id'),
+            columns=['title', 'key'],
+        ).merge(titles[['title', 'reviews_count']], on='title')
+        categories = titles.dropna(subset=['category'])
+        return pd.concat([
+            pd.DataFrame({
+                'title': categories['title'],
+                'dimension': RatingStats.CATEGORY,
+                'key': categories['category'],
+                'reviews_count': categories['reviews_count'],
+            }),
+            genres.assign(dimension=RatingStats.GENRE),
+            titles.assign(dimension=RatingStats.YEAR, key=titles['year']),
+        ], sort=False)[
+            ['title', 'dimension', 'key', 'reviews_count']
+        ].astype({'title': np.int64, 'key': np.int64})
+
+    def dirty_groups(self, memberships, watermark, last_id):
+        """Группы, которые надо пересчитать после курсора watermark.
+
+        Это группы произведений, у которых изменились отзывы или сами
+        произведения, и группы, где сохранённое число отзывов разошлось
+        с Title.reviews_count: так находятся удалённые отзывы и
+        произведения, перенесённые в другую категорию, жанр или год.
+        Рост числа отзывов в группе всегда оставляет запись в журнале,
+        поэтому убыль не может незаметно им компенсироваться.
+        """
+        entries = ChangeLog.objects.filter(
+            seq__gt=watermark, seq__lte=last_id
+        )
+        title_ids = set(
+            entries.filter(model='title').values_list('object_id', flat=True)
+        )
+        title_ids.update(Review.objects.filter(
+            pk__in=entries.filter(model='review').values('object_id')
+        ).values_list('title_id', flat=True))
+        changed = memberships[memberships['title'].isin(title_ids)][GROUP]
+
+        live = memberships.groupby(GROUP)['reviews_count'].sum()
+        stored = pd.DataFrame.from_records(
+            RatingStats.objects.values_list(*GROUP, 'reviews_count'),
+            columns=GROUP + ['reviews_count'],
+        ).set_index(GROUP)['reviews_count']
+        live, stored = live.align(stored, fill_value=0)
+        drifted = live[live != stored].index.to_frame(index=False)
+        return pd.concat([changed, drifted]).drop_duplicates().astype(
+            {'key': np.int64}
+        )
+
+    def partials(self, title_ids, chunk_size, everything):
+        """Читает оценки курсором и сворачивает их пачками по chunk_size."""
+        reviews = Review.objects.filter(
+            title__is_deleted=False, author__is_deleted=False
+        )
+        if not everything:
+            reviews = reviews.filter(title_id__in=title_ids.tolist())
+        rows = reviews.order_by().values_list('title_id', 'score').iterator(
+            chunk_size=chunk_size
+        )
+        parts, buffer = [], []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= chunk_size:
+                parts.append(title_partials(buffer))
+                buffer = []
+                if len(parts) >= 16:
+                    parts = [combine(parts)]
+        if buffer:
+            parts.append(title_partials(buffer))
+        return combine(parts)
+
+    def save(self, stats, dirty, last_id):
+        """Пишет группы и курсор одной транзакцией: после сбоя пересчёт
+        повторится с прежнего курсора.
+        """
+        objects = [
+            RatingStats(
+                dimension=dimension, key=key, reviews_count=count,
+                average=average, variance=variance,
+            )
+            for dimension, key, count, average, variance
+            in stats.itertuples(index=False)
+        ]
+        with transaction.atomic():
+            stored = RatingStats.objects.all()
+            if dirty is not None:
+                condition = Q(pk__in=[])
+                for dimension, keys in dirty.groupby('dimension')['key']:
+                    condition |= Q(dimension=dimension, key__in=keys.tolist())
+                stored = stored.filter(condition)
+            stored.delete()
+            RatingStats.objects.bulk_create(objects, batch_size=1000)
+            self.save_watermark(last_id)
+            rating_stats.invalidate()
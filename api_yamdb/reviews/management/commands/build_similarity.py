@@ -0,0 +1,175 @@
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from reviews.models import Review, TitleSimilarity, Watermark
+
+WATERMARK = 'similarity'
+COLUMNS = ['author', 'title', 'score']
+
+
+def pair_products(rows, max_per_user):
+    """Скалярные произведения оценок для пар произведений одного автора.
+
+    Это фрагмент произведения Aᵀ·A разреженной матрицы «автор × произведение»,
+    посчитанный через self-join по автору.
+    """
+    frame = pd.DataFrame.from_records(rows, columns=COLUMNS)
+    sizes = frame.groupby('author')['title'].transform('size')
+    frame = frame[sizes <= max_per_user]
+    pairs = frame.merge(frame, on='author', suffixes=('', '_other'))
+    pairs = pairs[pairs['title'] != pairs['title_other']]
+    pairs = pairs.assign(
+        dot=pairs['score'] * pairs['score_other'], common=1
+    )
+    return pairs.groupby(['title', 'title_other'])[['dot', 'common']].sum()
+
+
+def combine(parts):
+    if not parts:
+        return pd.DataFrame(
+            columns=['dot', 'common'],
+            index=pd.MultiIndex.from_arrays(
+                [[], []], names=['title', 'title_other']
+            ),
+        )
+    return pd.concat(parts).groupby(level=[0, 1]).sum()
+
+
+class Command(BaseCommand):
+    help = ('Builds the similar titles table from the author x title score '
+            'matrix; refreshes incrementally from the last processed review')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=100000)
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument('--min-common', type=int, default=2)
+        parser.add_argument(
+            '--max-reviews-per-user', type=int, default=1000,
+            help='Skip authors with more reviews to bound the pair count'
+        )
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Rebuild the whole table instead of the changed titles'
+        )
+
+    def handle(self, *args, **options):
+        last_id = Review.objects.aggregate(last_id=Max('pk'))['last_id'] or 0
+        reviews = Review.objects.filter(pk__lte=last_id,
+                                        title__is_deleted=False)
+        watermark = Watermark.objects.filter(name=WATERMARK).values_list(
+            'value', flat=True
+        ).first()
+        affected = None
+        if watermark is not None and not options['full']:
+            affected = set(
+                reviews.filter(pk__gt=watermark)
+                .values_list('title_id', flat=True).distinct()
+            )
+            reviews = reviews.filter(author__in=Review.objects.filter(
+                title_id__in=affected).values('author_id'))
+
+        pairs = self.co_ratings(
+            reviews, options['chunk_size'], options['max_reviews_per_user']
+        )
+        similarities = self.similarities(
+            pairs, last_id, options['min_common']
+        )
+        refreshed = None
+        if affected is not None:
+            similarities, refreshed = self.merge_stored(
+                similarities, affected
+            )
+        top = (
+            similarities.sort_values(['title', 'score'],
+                                     ascending=[True, False])
+            .groupby('title').head(options['top'])
+        )
+        self.save(top, refreshed, last_id)
+        self.stdout.write(
+            f'Сохранено {len(top)} пар для '
+            f'{top["title"].nunique()} произведений'
+        )
+
+    def co_ratings(self, reviews, chunk_size, max_per_user):
+        """Читает отзывы курсором, упорядоченно по автору, пачками.
+
+        Пачка режется только на границе авторов, поэтому все пары
+        одного автора попадают в одну пачку.
+        """
+        rows = (
+            reviews.order_by('author_id')
+            .values_list('author_id', 'title_id', 'score')
+            .iterator(chunk_size=chunk_size)
+        )
+        parts, buffer = [], []
+        for row in rows:
+            if len(buffer) >= chunk_size and row[0] != buffer[-1][0]:
+                parts.append(pair_products(buffer, max_per_user))
+                buffer = []
+                if len(parts) >= 16:
+                    parts = [combine(parts)]
+            buffer.append(row)
+        if buffer:
+            parts.append(pair_products(buffer, max_per_user))
+        return combine(parts)
+
+    def similarities(self, pairs, last_id, min_common):
+        """Косинусная мера по оценкам: dot / (|a| * |b|)."""
+        norms = pd.Series({
+            row['title_id']: np.sqrt(row['norm'])
+            for row in Review.objects.filter(pk__lte=last_id)
+            .values('title_id')
+            .annotate(norm=Sum(F('score') * F('score')))
+        }, dtype=float)
+        pairs = pairs[pairs['common'] >= min_common].reset_index()
+        pairs['score'] = pairs['dot'] / (
+            norms.reindex(pairs['title']).to_numpy()
+            * norms.reindex(pairs['title_other']).to_numpy()
+        )
+        return pairs.rename(columns={'title_other': 'similar'})[
+            ['title', 'similar', 'score']
+        ].dropna()
+
+    def merge_stored(self, similarities, affected):
+        """Дополняет пересчитанные пары сохранёнными для инкремента.
+
+        Для изменившихся произведений списки посчитаны полностью; для
+        их соседей новые значения сливаются с сохранёнными парами
+        с неизменившимися произведениями. Изменения и удаления старых
+        отзывов учитывает только полная перестройка (--full).
+        """
+        changed = similarities['title'].isin(affected)
+        reverse = similarities[
+            ~changed & similarities['similar'].isin(affected)
+        ]
+        stored = pd.DataFrame.from_records(
+            TitleSimilarity.objects.filter(
+                title_id__in=set(reverse['title'])
+            ).exclude(similar_id__in=affected)
+            .values_list('title_id', 'similar_id', 'score'),
+            columns=['title', 'similar', 'score'],
+        )
+        merged = pd.concat([similarities[changed], reverse, stored])
+        return merged, affected | set(reverse['title'])
+
+    def save(self, top, refreshed, last_id):
+        """Пишет пары и курсор одной транзакцией: после сбоя пересчёт
+        повторится с прежнего курсора.
+        """
+        objects = [
+            TitleSimilarity(title_id=title, similar_id=similar, score=score)
+            for title, similar, score in top.itertuples(index=False)
+        ]
+        with transaction.atomic():
+            if refreshed is None:
+                TitleSimilarity.objects.all().delete()
+            else:
+                TitleSimilarity.objects.filter(
+                    title_id__in=refreshed
+                ).delete()
+            TitleSimilarity.objects.bulk_create(objects, batch_size=1000)
+            Watermark.objects.update_or_create(
+                name=WATERMARK, defaults={'value': last_id}
+            )
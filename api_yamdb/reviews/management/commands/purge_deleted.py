@@ -0,0 +1,100 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from reviews.changes import record_changes, touch
+from reviews.models import Category, Comments, GenreTitle, Review, Title, User
+from reviews.stats import delete_comments, delete_reviews
+
+BATCH_DELETERS = {
+    Comments: delete_comments,
+    Review: delete_reviews,
+}
+
+
+def delete_in_batches(queryset, batch_size, pause=0):
+    """Удаляет выборку пачками по batch_size строк, каждую в своей транзакции.
+
+    Зависимые строки должны быть удалены заранее: тогда Django удаляет
+    пачку одним DELETE ... WHERE id IN (...), не обходя каскад в Python.
+    Для отзывов и комментариев заодно пересчитываются счётчики авторов.
+    """
+    model = queryset.model
+    delete = BATCH_DELETERS.get(model, lambda batch: batch.delete())
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            delete(model.objects.filter(pk__in=ids))
+        deleted += len(ids)
+        time.sleep(pause)
+
+
+def update_in_batches(queryset, batch_size, pause=0, **values):
+    updated = 0
+    while True:
+        ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return updated
+        with transaction.atomic():
+            updated += queryset.model.objects.filter(pk__in=ids).update(
+                **touch(values, queryset.model)
+            )
+            record_changes(queryset.model, ids)
+        time.sleep(pause)
+
+
+class Command(BaseCommand):
+    help = 'Purges soft-deleted titles, categories and users in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Seconds to sleep between batches'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help='Run forever, purging every INTERVAL seconds'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.purge(options['batch_size'], options['pause'])
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
+
+    def purge(self, batch_size, pause):
+        for category_id in Category.objects.filter(
+                is_deleted=True).values_list('pk', flat=True):
+            update_in_batches(
+                Title.objects.filter(category_id=category_id),
+                batch_size, pause, category=None
+            )
+            Category.objects.filter(pk=category_id).delete()
+            self.stdout.write(f'Категория {category_id} удалена')
+
+        for title_id in Title.objects.filter(
+                is_deleted=True).values_list('pk', flat=True):
+            for queryset in (
+                Comments.objects.filter(review__title_id=title_id),
+                Review.objects.filter(title_id=title_id),
+                GenreTitle.objects.filter(title_id=title_id),
+            ):
+                delete_in_batches(queryset, batch_size, pause)
+            Title.objects.filter(pk=title_id).delete()
+            self.stdout.write(f'Произведение {title_id} удалено')
+
+        for user_id in User.objects.filter(
+                is_deleted=True).values_list('pk', flat=True):
+            for queryset in (
+                Comments.objects.filter(author_id=user_id),
+                Comments.objects.filter(review__author_id=user_id),
+                Review.objects.filter(author_id=user_id),
+            ):
+                delete_in_batches(queryset, batch_size, pause)
+            User.objects.filter(pk=user_id).delete()
+            self.stdout.write(f'Пользователь {user_id} удалён')
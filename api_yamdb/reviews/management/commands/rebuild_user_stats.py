@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from reviews.models import User
+from reviews.stats import refresh_user_stats
+
+
+class Command(BaseCommand):
+    help = 'Recomputes review and comment counters of users in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = User.objects.aggregate(last_id=Max('pk'))['last_id'] or 0
+        updated = 0
+        for start in range(0, last_id + 1, batch_size):
+            updated += refresh_user_stats(
+                User.objects.filter(pk__gte=start, pk__lt=start + batch_size)
+                .values('pk')
+            )
+        self.stdout.write(f'Пересчитано пользователей: {updated}')
@@ -0,0 +1,40 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_auto_20221111_0836'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='is_deleted',
+            field=models.BooleanField(default=False, verbose_name='Удалена'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='is_deleted',
+            field=models.BooleanField(default=False, verbose_name='Удалено'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='is_deleted',
+            field=models.BooleanField(default=False, verbose_name='Удалён'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(condition=models.Q(is_deleted=True), fields=['id'], name='category_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(condition=models.Q(is_deleted=True), fields=['id'], name='title_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(is_deleted=True), fields=['id'], name='user_deleted_idx'),
+        ),
+    ]
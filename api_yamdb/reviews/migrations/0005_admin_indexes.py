@@ -0,0 +1,50 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:59
+
+from django.db import migrations, models
+
+# Индексы под поиск в админке: icontains по названию произведения
+# (триграммы) и istartswith по имени пользователя.
+POSTGRES_INDEXES = (
+    ('title_name_upper_trgm',
+     'CREATE INDEX IF NOT EXISTS title_name_upper_trgm ON reviews_title '
+     'USING gin (UPPER(name::text) gin_trgm_ops)'),
+    ('user_username_upper_like',
+     'CREATE INDEX IF NOT EXISTS user_username_upper_like ON reviews_user '
+     '(UPPER(username::text) text_pattern_ops)'),
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for _, sql in POSTGRES_INDEXES:
+        schema_editor.execute(sql)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in POSTGRES_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_soft_delete'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comments',
+            name='pub_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата создания комментария'),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='pub_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата создания отзыва'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
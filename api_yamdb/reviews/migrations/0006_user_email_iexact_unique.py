@@ -0,0 +1,16 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE UNIQUE INDEX user_email_upper_uniq '
+            'ON reviews_user (UPPER(email))',
+            'DROP INDEX user_email_upper_uniq',
+        ),
+    ]
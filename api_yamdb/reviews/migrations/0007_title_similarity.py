@@ -0,0 +1,35 @@
+# Generated by Django 2.2.28 on 2026-10-19 10:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_user_email_iexact_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleSimilarity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Сходство')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.Title', verbose_name='Похожее произведение')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarities', to='reviews.Title', verbose_name='Произведение')),
+            ],
+            options={
+                'verbose_name': 'Похожее произведение',
+                'verbose_name_plural': 'Похожие произведения',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='titlesimilarity',
+            index=models.Index(fields=['title', '-score'], name='title_similarity_score_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='titlesimilarity',
+            constraint=models.UniqueConstraint(fields=('title', 'similar'), name='unique_title_similarity'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 2.2.28 on 2026-10-19 10:03
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_user_stats(apps, schema_editor):
+    User = apps.get_model('reviews', 'User')
+    Review = apps.get_model('reviews', 'Review')
+    Comments = apps.get_model('reviews', 'Comments')
+
+    def by_author(model, aggregate):
+        return Coalesce(Subquery(
+            model.objects.filter(author=OuterRef('pk')).order_by()
+            .values('author').annotate(value=aggregate).values('value'),
+            output_field=IntegerField()
+        ), 0)
+
+    User.objects.update(
+        reviews_count=by_author(Review, Count('pk')),
+        score_sum=by_author(Review, Sum('score')),
+        comments_count=by_author(Comments, Count('pk')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_title_similarity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Комментариев'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Отзывов'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='score_sum',
+            field=models.PositiveIntegerField(default=0, verbose_name='Сумма оценок'),
+        ),
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 2.2.28 on 2026-10-19 10:10
+
+from django.db import migrations, models
+
+# Начальный снимок: курсор 0 отдаёт все существующие объекты.
+SEED_TABLES = (
+    ('category', 'reviews_category', 'WHERE NOT is_deleted'),
+    ('genre', 'reviews_genre', ''),
+    ('title', 'reviews_title', 'WHERE NOT is_deleted'),
+    ('review', 'reviews_review', ''),
+    ('comments', 'reviews_comments', ''),
+)
+
+SEED_SQL = [
+    f"INSERT INTO reviews_changelog (model, object_id, operation, created_at) "
+    f"SELECT '{model}', id, 'upsert', CURRENT_TIMESTAMP FROM {table} {where} "
+    f"ORDER BY id"
+    for model, table, where in SEED_TABLES
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_user_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(choices=[('category', 'category'), ('genre', 'genre'), ('title', 'title'), ('review', 'review'), ('comments', 'comments')], max_length=16)),
+                ('object_id', models.PositiveIntegerField()),
+                ('operation', models.CharField(choices=[('upsert', 'upsert'), ('delete', 'delete')], max_length=6)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Изменение',
+                'verbose_name_plural': 'Журнал изменений',
+            },
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменено'),
+        ),
+        migrations.AddField(
+            model_name='comments',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменено'),
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменено'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменено'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменено'),
+        ),
+        migrations.RunSQL(SEED_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 2.2.28 on 2026-10-19 10:13
+
+from django.db import migrations, models
+from django.db.models import (Avg, Count, FloatField, IntegerField, OuterRef,
+                              Subquery)
+from django.db.models.functions import Coalesce
+
+# Для ?ordering=-rating (DESC NULLS LAST) обратный проход по
+# title_rating_idx не подходит: он отдаёт NULL первыми.
+RATING_DESC_INDEX = (
+    'CREATE INDEX IF NOT EXISTS title_rating_desc_idx ON reviews_title '
+    '(rating DESC NULLS LAST, id DESC) WHERE NOT is_deleted'
+)
+
+
+def fill_title_stats(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+
+    def by_title(aggregate, output_field):
+        return Subquery(
+            Review.objects.filter(title=OuterRef('pk')).order_by()
+            .values('title').annotate(value=aggregate).values('value'),
+            output_field=output_field
+        )
+
+    Title.objects.update(
+        reviews_count=Coalesce(by_title(Count('pk'), IntegerField()), 0),
+        rating=by_title(Avg('score'), FloatField()),
+    )
+
+
+def create_rating_desc_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(RATING_DESC_INDEX)
+
+
+def drop_rating_desc_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS title_rating_desc_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='rating',
+            field=models.FloatField(blank=True, null=True, verbose_name='Рейтинг'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Отзывов'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['rating', 'id'], name='title_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['reviews_count', 'id'], name='title_reviews_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['year', 'id'], name='title_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['name', 'id'], name='title_name_idx'),
+        ),
+        migrations.RunPython(fill_title_stats, migrations.RunPython.noop),
+        migrations.RunPython(
+            create_rating_desc_index, drop_rating_desc_index
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-19 10:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_title_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('category', 'Категория'), ('genre', 'Жанр'), ('year', 'Год')], max_length=8, verbose_name='Разрез')),
+                ('key', models.IntegerField(verbose_name='id категории или жанра, год')),
+                ('reviews_count', models.PositiveIntegerField(default=0, verbose_name='Отзывов')),
+                ('average', models.FloatField(null=True, verbose_name='Средняя оценка')),
+                ('variance', models.FloatField(null=True, verbose_name='Дисперсия оценок')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Изменено')),
+            ],
+            options={
+                'verbose_name': 'Статистика оценок',
+                'verbose_name_plural': 'Статистика оценок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='ratingstats',
+            constraint=models.UniqueConstraint(fields=('dimension', 'key'), name='unique_rating_stats'),
+        ),
+    ]
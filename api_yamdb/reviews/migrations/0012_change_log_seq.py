@@ -0,0 +1,30 @@
+# Generated by Django 2.2.28 on 2026-10-19 10:44
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def sequence_existing(apps, schema_editor):
+    """Старые записи сохраняют номера: курсоры клиентов остаются верными."""
+    ChangeLog = apps.get_model('reviews', 'ChangeLog')
+    ChangeLog.objects.update(seq=F('id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_rating_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='changelog',
+            name='seq',
+            field=models.BigIntegerField(editable=False, null=True, unique=True),
+        ),
+        migrations.RunPython(sequence_existing, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(condition=models.Q(seq__isnull=True), fields=['id'], name='changelog_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.28 on 2026-10-19 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_change_log_seq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Watermark',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True, verbose_name='Имя')),
+                ('value', models.BigIntegerField(verbose_name='Значение')),
+            ],
+            options={
+                'verbose_name': 'Курсор',
+                'verbose_name_plural': 'Курсоры',
+            },
+        ),
+    ]
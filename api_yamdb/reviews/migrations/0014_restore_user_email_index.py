@@ -0,0 +1,20 @@
+from django.db import migrations
+
+# SQLite пересоздаёт таблицу при AddField (0008_user_stats) и теряет
+# индекс из 0006, о котором Django не знает. Пересоздаём его последним;
+# миграции, меняющие reviews_user, должны повторять этот шаг.
+RESTORE_INDEX = (
+    'DROP INDEX IF EXISTS user_email_upper_uniq',
+    'CREATE UNIQUE INDEX user_email_upper_uniq ON reviews_user (UPPER(email))',
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0013_watermark'),
+    ]
+
+    operations = [
+        migrations.RunSQL(RESTORE_INDEX, migrations.RunSQL.noop),
+    ]
@@ -3,6 +3,8 @@ import datetime
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Cast, Concat
 
 USER = 'user'
 ADMIN = 'admin'
@@ -49,6 +51,19 @@ class User(AbstractUser):
     is_staff = models.BooleanField(default=False)
     first_name = models.CharField(max_length=150, blank=True)
     last_name = models.CharField(max_length=150, blank=True)
+    is_deleted = models.BooleanField(default=False, verbose_name='Удалён')
+    reviews_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Отзывов'
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Комментариев'
+    )
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Сумма оценок'
+    )
 
     @property
     def is_admin(self):
@@ -62,6 +77,12 @@ class User(AbstractUser):
     def is_user(self):
         return self.role == USER
 
+    @property
+    def average_score(self):
+        if not self.reviews_count:
+            return None
+        return round(self.score_sum / self.reviews_count, 2)
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -69,18 +90,42 @@ class User(AbstractUser):
                 name='unique_username_email'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['id'],
+                condition=models.Q(is_deleted=True),
+                name='user_deleted_idx'
+            ),
+        ]
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
 
 
+def deleted_slug():
+    """Slug категории, помеченной удалённой: исходный освобождается сразу,
+    а не после purge_deleted. Двоеточие не проходит валидацию SlugField,
+    поэтому со slug'ом живой категории значение не совпадёт.
+    """
+    return Concat(Value('deleted:'), Cast('pk', models.CharField()))
+
+
 class Category(models.Model):
     name = models.CharField(
         'Название категории',
         max_length=256
     )
     slug = models.SlugField(unique=True, max_length=50)
+    is_deleted = models.BooleanField(default=False, verbose_name='Удалена')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Изменено')
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=['id'],
+                condition=models.Q(is_deleted=True),
+                name='category_deleted_idx'
+            ),
+        ]
         verbose_name = 'Категория'
         verbose_name_plural = 'Категории'
 
@@ -94,6 +139,7 @@ class Genre(models.Model):
         max_length=256
     )
     slug = models.SlugField(unique=True)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Изменено')
 
     class Meta:
         verbose_name = 'Жанр'
@@ -130,8 +176,43 @@ class Title(models.Model):
         ],
         verbose_name='Год'
     )
+    is_deleted = models.BooleanField(default=False, verbose_name='Удалено')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Изменено')
+    rating = models.FloatField(null=True, blank=True, verbose_name='Рейтинг')
+    reviews_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Отзывов'
+    )
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=['id'],
+                condition=models.Q(is_deleted=True),
+                name='title_deleted_idx'
+            ),
+            # Сортировки списка: (поле, id) читаются индексом в обе стороны.
+            models.Index(
+                fields=['rating', 'id'],
+                condition=models.Q(is_deleted=False),
+                name='title_rating_idx'
+            ),
+            models.Index(
+                fields=['reviews_count', 'id'],
+                condition=models.Q(is_deleted=False),
+                name='title_reviews_count_idx'
+            ),
+            models.Index(
+                fields=['year', 'id'],
+                condition=models.Q(is_deleted=False),
+                name='title_year_idx'
+            ),
+            models.Index(
+                fields=['name', 'id'],
+                condition=models.Q(is_deleted=False),
+                name='title_name_idx'
+            ),
+        ]
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
 
@@ -178,8 +259,10 @@ class Review(models.Model):
     )
     pub_date = models.DateTimeField(
         auto_now_add=True,
+        db_index=True,
         verbose_name='Дата создания отзыва'
     )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Изменено')
 
     class Meta:
         constraints = [
@@ -209,8 +292,10 @@ class Comments(models.Model):
     )
     pub_date = models.DateTimeField(
         auto_now_add=True,
+        db_index=True,
         verbose_name='Дата создания комментария'
     )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Изменено')
 
     class Meta:
         verbose_name = 'Комментарий'
@@ -218,3 +303,140 @@ class Comments(models.Model):
 
     def __str__(self):
         return self.text
+
+
+class TitleSimilarity(models.Model):
+    """Похожие произведения; заполняется командой build_similarity."""
+
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='similarities',
+        verbose_name='Произведение'
+    )
+    similar = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожее произведение'
+    )
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'similar'], name='unique_title_similarity'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['title', '-score'], name='title_similarity_score_idx'
+            ),
+        ]
+        verbose_name = 'Похожее произведение'
+        verbose_name_plural = 'Похожие произведения'
+
+    def __str__(self):
+        return f'{self.title_id} ~ {self.similar_id}: {self.score:.3f}'
+
+
+class ChangeLog(models.Model):
+    """Журнал изменений для синхронизации внешних систем (/changes/).
+
+    id выдаётся при вставке, а seq — после коммита (reviews.changes
+    .sequence_changes), поэтому порядок seq совпадает с порядком коммитов.
+    """
+
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    OPERATION_CHOICES = (
+        (UPSERT, 'upsert'),
+        (DELETE, 'delete'),
+    )
+    MODEL_CHOICES = (
+        ('category', 'category'),
+        ('genre', 'genre'),
+        ('title', 'title'),
+        ('review', 'review'),
+        ('comments', 'comments'),
+    )
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=16, choices=MODEL_CHOICES)
+    object_id = models.PositiveIntegerField()
+    operation = models.CharField(max_length=6, choices=OPERATION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+    seq = models.BigIntegerField(null=True, unique=True, editable=False)
+
+    class Meta:
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Журнал изменений'
+        indexes = [
+            models.Index(
+                fields=['id'],
+                name='changelog_pending_idx',
+                condition=models.Q(seq__isnull=True)
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.id}: {self.operation} {self.model} {self.object_id}'
+
+
+class RatingStats(models.Model):
+    """Сводка оценок по категориям, жанрам и годам.
+
+    Заполняется командой build_rating_stats; строка есть только у групп,
+    в которых есть отзывы.
+    """
+
+    CATEGORY = 'category'
+    GENRE = 'genre'
+    YEAR = 'year'
+    DIMENSION_CHOICES = (
+        (CATEGORY, 'Категория'),
+        (GENRE, 'Жанр'),
+        (YEAR, 'Год'),
+    )
+    dimension = models.CharField(
+        max_length=8,
+        choices=DIMENSION_CHOICES,
+        verbose_name='Разрез'
+    )
+    key = models.IntegerField(verbose_name='id категории или жанра, год')
+    reviews_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Отзывов'
+    )
+    average = models.FloatField(null=True, verbose_name='Средняя оценка')
+    variance = models.FloatField(null=True, verbose_name='Дисперсия оценок')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Изменено')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dimension', 'key'], name='unique_rating_stats'
+            ),
+        ]
+        verbose_name = 'Статистика оценок'
+        verbose_name_plural = 'Статистика оценок'
+
+    def __str__(self):
+        return f'{self.dimension} {self.key}: {self.average}'
+
+
+class Watermark(models.Model):
+    """Курсор фоновой команды: до какой записи журнала или отзыва она дошла.
+
+    Хранится в базе, чтобы пересчёт не начинался с нуля после очистки
+    кэша или перезапуска контейнера.
+    """
+
+    name = models.CharField(max_length=64, unique=True, verbose_name='Имя')
+    value = models.BigIntegerField(verbose_name='Значение')
+
+    class Meta:
+        verbose_name = 'Курсор'
+        verbose_name_plural = 'Курсоры'
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
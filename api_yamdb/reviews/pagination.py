@@ -0,0 +1,110 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+COUNT_THRESHOLD = 10000
+COUNT_CACHE_TIMEOUT = 60
+
+
+class EstimatedPage(Page):
+    """Страница, которая узнаёт о следующей по лишней строке выборки."""
+
+    def __init__(self, object_list, number, paginator, has_more):
+        super().__init__(object_list, number, paginator)
+        self.has_more = has_more
+
+    def has_next(self):
+        return self.has_more
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator без точного COUNT(*) для больших выборок.
+
+    На Postgres сначала берётся оценка планировщика: если она не меньше
+    ``threshold``, она и возвращается. Иначе (и на других СУБД) считается
+    точное количество; большие значения кэшируются на ``cache_timeout``
+    секунд. Приблизительный результат помечается в
+    ``count_is_approximate``.
+
+    Оценка бывает ниже настоящего числа строк, поэтому с ней номер
+    страницы не сверяется с num_pages: пустая ли страница, решают сами
+    строки.
+    """
+
+    def __init__(self, object_list, per_page, *args,
+                 threshold=COUNT_THRESHOLD, cache_timeout=COUNT_CACHE_TIMEOUT,
+                 **kwargs):
+        super().__init__(object_list, per_page, *args, **kwargs)
+        self.threshold = threshold
+        self.cache_timeout = cache_timeout
+        self.count_is_approximate = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return len(queryset)
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        estimate = self.estimate(sql, params)
+        if estimate is not None and estimate >= self.threshold:
+            self.count_is_approximate = True
+            return estimate
+        return self.cached_count(sql, params)
+
+    def validate_number(self, number):
+        if not (self.count and self.count_is_approximate):
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.count_is_approximate:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        page_rows = rows[:self.per_page]
+        self.__dict__['count'] = max(self.count, bottom + len(page_rows))
+        return EstimatedPage(
+            page_rows, number, self, has_more=len(rows) > self.per_page
+        )
+
+    def estimate(self, sql, params):
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']['Plan Rows']
+
+    def cached_count(self, sql, params):
+        key = 'count:' + hashlib.md5(
+            repr((sql, params)).encode()
+        ).hexdigest()
+        count = cache.get(key)
+        if count is not None:
+            self.count_is_approximate = True
+            return count
+        count = self.object_list.count()
+        if count >= self.threshold:
+            cache.set(key, count, self.cache_timeout)
+        return count
@@ -0,0 +1,136 @@
+from django.db import transaction
+from django.db.models import (Avg, Count, F, FloatField, IntegerField,
+                              OuterRef, Subquery, Sum)
+from django.db.models.functions import Coalesce
+
+from .catalog import bump_version
+from .changes import record_deletes
+from .models import Comments, Review, Title, User
+
+TITLE_STATS_VERSION = 'title-stats'
+USER_STATS_VERSION = 'user-stats'
+
+
+def bump_after_commit(name):
+    # Вне транзакции on_commit срабатывает сразу, поэтому только после
+    # UPDATE: иначе процессы перечитают ещё старые значения.
+    transaction.on_commit(lambda: bump_version(name))
+
+
+def grouped_subquery(queryset, aggregate, group_by, output_field):
+    return Subquery(
+        queryset.filter(**{group_by: OuterRef('pk')}).order_by()
+        .values(group_by).annotate(value=aggregate).values('value'),
+        output_field=output_field
+    )
+
+
+def aggregate_subquery(queryset, aggregate, group_by='author'):
+    return Coalesce(
+        grouped_subquery(queryset, aggregate, group_by, IntegerField()), 0
+    )
+
+
+def refresh_user_stats(user_ids=None):
+    """Пересчитывает счётчики пользователей одним UPDATE."""
+    users = User.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    updated = users.update(
+        reviews_count=aggregate_subquery(Review.objects, Count('pk')),
+        score_sum=aggregate_subquery(Review.objects, Sum('score')),
+        comments_count=aggregate_subquery(Comments.objects, Count('pk')),
+    )
+    if updated:
+        bump_after_commit(USER_STATS_VERSION)
+    return updated
+
+
+def refresh_title_stats(title_ids=None):
+    """Пересчитывает рейтинг и число отзывов произведений одним UPDATE.
+
+    Отзывы удалённых пользователей не учитываются, хотя до purge_deleted
+    ещё лежат в базе.
+    """
+    titles = Title.objects.all()
+    if title_ids is not None:
+        titles = titles.filter(pk__in=title_ids)
+    reviews = Review.objects.filter(author__is_deleted=False)
+    updated = titles.update(
+        reviews_count=aggregate_subquery(
+            reviews, Count('pk'), group_by='title'
+        ),
+        rating=grouped_subquery(reviews, Avg('score'), 'title', FloatField()),
+    )
+    if updated:
+        bump_after_commit(TITLE_STATS_VERSION)
+    return updated
+
+
+def authors_deleted(user_ids):
+    """Убирает отзывы помеченных удалёнными авторов из рейтингов."""
+    return refresh_title_stats(
+        Review.objects.filter(author_id__in=user_ids).values('title_id')
+    )
+
+
+def review_added(review):
+    User.objects.filter(pk=review.author_id).update(
+        reviews_count=F('reviews_count') + 1,
+        score_sum=F('score_sum') + review.score,
+    )
+    bump_after_commit(USER_STATS_VERSION)
+    refresh_title_stats([review.title_id])
+
+
+def review_score_changed(review, old_score):
+    if review.score != old_score:
+        User.objects.filter(pk=review.author_id).update(
+            score_sum=F('score_sum') + review.score - old_score
+        )
+        bump_after_commit(USER_STATS_VERSION)
+        refresh_title_stats([review.title_id])
+
+
+def comment_added(comment):
+    User.objects.filter(pk=comment.author_id).update(
+        comments_count=F('comments_count') + 1
+    )
+    bump_after_commit(USER_STATS_VERSION)
+
+
+def remove_comments(queryset):
+    """Удаляет комментарии без пересчёта счётчиков; возвращает число
+    удалённых и id их авторов.
+    """
+    rows = list(queryset.values_list('pk', 'author_id'))
+    if not rows:
+        return 0, set()
+    ids = [pk for pk, _ in rows]
+    deleted, _ = Comments.objects.filter(pk__in=ids).delete()
+    record_deletes(Comments, ids)
+    return deleted, {author for _, author in rows}
+
+
+def delete_comments(queryset):
+    """Удаляет комментарии и пересчитывает счётчики их авторов."""
+    deleted, authors = remove_comments(queryset)
+    if authors:
+        refresh_user_stats(authors)
+    return deleted
+
+
+def delete_reviews(queryset):
+    """Удаляет отзывы с комментариями и пересчитывает счётчики авторов
+    и рейтинги произведений — по одному разу на автора и произведение.
+    """
+    rows = list(queryset.values_list('pk', 'author_id', 'title_id'))
+    if not rows:
+        return 0
+    ids = [pk for pk, _, _ in rows]
+    _, authors = remove_comments(Comments.objects.filter(review_id__in=ids))
+    Review.objects.filter(pk__in=ids).delete()
+    record_deletes(Review, ids)
+    refresh_user_stats(authors | {author for _, author, _ in rows})
+    refresh_title_stats({title for _, _, title in rows})
+    return len(ids)
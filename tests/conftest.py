@@ -1,9 +1,32 @@
+import os
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+from django.db import OperationalError, connection
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
+sys.path.append(join(root_dir, 'api_yamdb'))
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
+    'api.pytest_plugin',
 ]
+
+
+@pytest.fixture(scope='session')
+def database_available(django_db_blocker):
+    """Пропускает тест, если база данных недоступна (например, локально
+    без Postgres). В CI база поднимается сервисом, и её отсутствие — ошибка.
+    """
+    probe = connection.copy()
+    with django_db_blocker.unblock():
+        try:
+            probe.ensure_connection()
+        except OperationalError:
+            if os.getenv('CI'):
+                raise
+            pytest.skip('База данных недоступна')
+        finally:
+            probe.close()
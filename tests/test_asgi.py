@@ -0,0 +1,76 @@
+import asyncio
+
+from api.asgi import AsgiApplication
+
+
+def echo(environ, start_response):
+    start_response('201 Created', [('X-Path', environ['PATH_INFO'])])
+    body = environ['wsgi.input'].read()
+    return [
+        environ['REQUEST_METHOD'].encode(), b' ',
+        environ['QUERY_STRING'].encode(), b' ',
+        environ.get('HTTP_X_TOKEN', '').encode(), b' ',
+        environ.get('CONTENT_TYPE', '').encode(), b' ', body,
+    ]
+
+
+def call(application, scope, messages):
+    sent = []
+    incoming = list(messages)
+
+    async def receive():
+        if incoming:
+            return incoming.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    return sent
+
+
+def http_scope(method='GET', path='/', query=b'', headers=()):
+    return {
+        'type': 'http', 'method': method, 'path': path,
+        'query_string': query, 'headers': list(headers),
+        'http_version': '1.1', 'scheme': 'http',
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 5000),
+    }
+
+
+def test_wsgi_application_runs_in_pool():
+    sent = call(
+        AsgiApplication(echo),
+        http_scope('POST', '/api/v1/тест/', b'a=1', headers=[
+            (b'x-token', b'one'), (b'x-token', b'two'),
+            (b'content-type', b'text/plain'),
+        ]),
+        [
+            {'type': 'http.request', 'body': b'he', 'more_body': True},
+            {'type': 'http.request', 'body': b'llo'},
+        ],
+    )
+    assert sent[0]['status'] == 201
+    assert sent[0]['headers'] == [
+        (b'X-Path', '/api/v1/тест/'.encode())
+    ]
+    assert sent[1]['body'] == b'POST a=1 one,two text/plain hello'
+
+
+def test_disconnected_client_is_not_served():
+    sent = call(
+        AsgiApplication(echo), http_scope(),
+        [{'type': 'http.disconnect'}],
+    )
+    assert sent == []
+
+
+def test_lifespan():
+    sent = call(
+        AsgiApplication(echo), {'type': 'lifespan'},
+        [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}],
+    )
+    assert [message['type'] for message in sent] == [
+        'lifespan.startup.complete', 'lifespan.shutdown.complete'
+    ]
@@ -0,0 +1,90 @@
+import time
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def admin_client(database_available, db):
+    from reviews.catalog import catalog
+    from reviews.models import ADMIN, Category, Genre, User
+
+    Category.objects.create(name='film', slug='film')
+    for slug in ('drama', 'comedy'):
+        Genre.objects.create(name=slug, slug=slug)
+    catalog._bump()
+    catalog.get()
+    client = APIClient()
+    client.force_authenticate(
+        User.objects.create(username='admin', email='admin@ya.ru', role=ADMIN)
+    )
+    return client
+
+
+def titles(count):
+    return [
+        {
+            'name': f'title {number}', 'year': 2000,
+            'category': 'film', 'genre': ['drama', 'comedy'][:number % 2 + 1],
+        }
+        for number in range(count)
+    ]
+
+
+def post_titles(client, data):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post('/api/v1/titles/', data, format='json')
+    return response, len(queries)
+
+
+def test_bulk_create_max_batch_is_fast(admin_client):
+    """Цель запроса: 1000 произведений заметно быстрее секунды."""
+    from api.serializers import MAX_BULK_TITLES
+
+    if not connection.features.can_return_ids_from_bulk_insert:
+        pytest.skip('База не возвращает id из bulk_create')
+    admin_client.post('/api/v1/titles/', titles(1), format='json')
+    started = time.perf_counter()
+    response = admin_client.post(
+        '/api/v1/titles/', titles(MAX_BULK_TITLES), format='json'
+    )
+    elapsed = time.perf_counter() - started
+    assert response.status_code == 201
+    assert elapsed < 1
+
+
+def test_bulk_create_query_count_is_constant(admin_client):
+    """Две вставки, запись в журнал и перечитывание на любой размер
+    пачки; slug'и категорий и жанров берутся из каталога в памяти.
+    """
+    from api.serializers import MAX_BULK_TITLES
+    from reviews.models import GenreTitle, Title
+
+    if not connection.features.can_return_ids_from_bulk_insert:
+        pytest.skip('База не возвращает id из bulk_create')
+    small, small_queries = post_titles(admin_client, titles(2))
+    full, full_queries = post_titles(
+        admin_client, titles(MAX_BULK_TITLES)
+    )
+
+    assert small.status_code == full.status_code == 201
+    assert len(full.json()) == MAX_BULK_TITLES
+    assert sorted(full.json()[1]['genre']) == ['comedy', 'drama']
+    assert full.json()[1]['category'] == 'film'
+    assert full_queries == small_queries
+    assert Title.objects.count() == MAX_BULK_TITLES + 2
+    assert GenreTitle.objects.count() == (MAX_BULK_TITLES + 2) * 3 // 2
+
+
+def test_bulk_create_over_limit_is_rejected(admin_client):
+    from api.serializers import MAX_BULK_TITLES
+    from reviews.models import Title
+
+    response = admin_client.post(
+        '/api/v1/titles/', titles(MAX_BULK_TITLES + 1), format='json'
+    )
+
+    assert response.status_code == 400
+    assert Title.objects.count() == 0
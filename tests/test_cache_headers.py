@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+from api.caching import CacheControlMixin
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+
+class DummyView(CacheControlMixin, APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        return Response({'ok': True})
+
+    def post(self, request):
+        return Response({'ok': True})
+
+
+class MissingView(DummyView):
+    def get(self, request):
+        return Response(status=404)
+
+
+class TestCacheHeaders:
+    factory = APIRequestFactory()
+
+    def test_anonymous_read_is_public(self):
+        response = DummyView.as_view()(self.factory.get('/'))
+        assert 'public' in response['Cache-Control']
+        assert 'max-age=5' in response['Cache-Control']
+        assert 'Authorization' in response['Vary']
+
+    def test_authenticated_read_is_private(self):
+        request = self.factory.get('/')
+        force_authenticate(request, user=SimpleNamespace(
+            is_authenticated=True
+        ))
+        response = DummyView.as_view()(request)
+        assert 'private' in response['Cache-Control']
+        assert 'public' not in response['Cache-Control']
+        assert 'Authorization' in response['Vary']
+
+    def test_authorization_header_is_private(self):
+        request = self.factory.get('/', HTTP_AUTHORIZATION='Bearer x')
+        response = DummyView.as_view()(request)
+        assert 'private' in response['Cache-Control']
+
+    def test_errors_are_not_stored(self):
+        response = MissingView.as_view()(self.factory.get('/'))
+        assert 'no-store' in response['Cache-Control']
+
+    def test_writes_have_no_cache_headers(self):
+        response = DummyView.as_view()(self.factory.post('/'))
+        assert not response.has_header('Cache-Control')
@@ -0,0 +1,76 @@
+import pytest
+from rest_framework.test import APIClient
+
+PARAMS = (
+    {},
+    {'page': 2},
+    {'genre': 'drama'},
+    {'genre': ['drama', 'comedy']},
+    {'category': 'book'},
+    {'year': 2005},
+    {'name': 'ITLE 1'},
+    {'ordering': '-rating'},
+    {'ordering': 'rating', 'page': 2},
+    {'ordering': 'name'},
+    {'ordering': '-reviews_count', 'genre': 'horror'},
+    {'ordering': 'year', 'category': 'film'},
+    {'genre': 'unknown'},
+    {'year': 'abc'},
+)
+
+
+@pytest.fixture
+def catalog_db(database_available, db):
+    from reviews.models import Category, Genre, GenreTitle, Review, Title
+    from reviews.models import User
+    from reviews.stats import refresh_title_stats
+
+    categories = [
+        Category.objects.create(name=slug, slug=slug)
+        for slug in ('film', 'book')
+    ]
+    genres = [
+        Genre.objects.create(name=slug, slug=slug)
+        for slug in ('drama', 'comedy', 'horror')
+    ]
+    users = [
+        User.objects.create(username=f'user{i}', email=f'user{i}@ya.ru')
+        for i in range(4)
+    ]
+    for number in range(25):
+        title = Title.objects.create(
+            name=f'title {number}',
+            year=2000 + number % 7,
+            category=categories[number % 2] if number % 5 else None,
+        )
+        for genre in genres[:number % 3 + 1]:
+            GenreTitle.objects.create(title=title, genre=genre)
+        for user in users[:number % 4]:
+            Review.objects.create(
+                title=title, author=user, text='text',
+                score=(number * 3 + user.pk) % 10 + 1
+            )
+    refresh_title_stats()
+    reset_catalog_caches()
+
+
+def reset_catalog_caches():
+    from api.snapshot import title_snapshot
+    from reviews.catalog import catalog
+    for versioned in (catalog, title_snapshot.columns,
+                      title_snapshot.ratings):
+        versioned._bump()
+
+
+@pytest.mark.parametrize('params', PARAMS)
+def test_snapshot_matches_orm(catalog_db, settings, params,
+                              django_assert_num_queries):
+    client = APIClient()
+    settings.CATALOG_SNAPSHOT = False
+    expected = client.get('/api/v1/titles/', params)
+    settings.CATALOG_SNAPSHOT = True
+    client.get('/api/v1/titles/', params)
+    with django_assert_num_queries(0):
+        response = client.get('/api/v1/titles/', params)
+    assert response.status_code == expected.status_code
+    assert response.json() == expected.json()
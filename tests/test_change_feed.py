@@ -0,0 +1,21 @@
+def test_late_commit_is_not_skipped(database_available, db):
+    """Запись с меньшим id, закоммиченная позже, идёт после курсора."""
+    from api.feed import read_changes
+    from reviews.models import ChangeLog
+
+    first = ChangeLog.objects.create(
+        model='genre', object_id=1, operation='upsert'
+    )
+    ChangeLog.objects.create(
+        pk=first.pk + 10, model='genre', object_id=3, operation='upsert'
+    )
+    cursor = read_changes(0, 100)['next']
+    ChangeLog.objects.create(
+        pk=first.pk + 5, model='genre', object_id=2, operation='upsert'
+    )
+
+    page = read_changes(cursor, 100)
+
+    assert [item['id'] for item in page['results']] == [2]
+    assert page['next'] > cursor
+    assert read_changes(page['next'], 100)['results'] == []
@@ -0,0 +1,291 @@
+"""Каждое действие вьюсетов укладывается в свой query_budget.
+
+Плагин api.pytest_plugin включает строгий режим QueryBudgetMiddleware:
+превышение бюджета или N+1 роняет запрос. Кэши в памяти процесса
+сбрасываются перед каждым тестом, чтобы их загрузка тоже попала
+в бюджет. Ниже — проверки ответов отдельных действий на тех же данных.
+"""
+import pytest
+from rest_framework.test import APIClient
+
+ENDPOINTS = (
+    ('UserViewSet.list', 'get', '/api/v1/users/', 'admin', None, 200),
+    ('UserViewSet.retrieve', 'get', '/api/v1/users/{author}/', 'admin',
+     None, 200),
+    ('UserViewSet.create', 'post', '/api/v1/users/', 'admin',
+     {'username': 'newbie', 'email': 'newbie@ya.ru'}, 201),
+    ('UserViewSet.update', 'put', '/api/v1/users/{author}/', 'admin',
+     {'username': 'author', 'email': 'author@ya.ru', 'bio': 'bio'}, 200),
+    ('UserViewSet.partial_update', 'patch', '/api/v1/users/{author}/',
+     'admin', {'bio': 'bio'}, 200),
+    ('UserViewSet.destroy', 'delete', '/api/v1/users/{reader}/', 'admin',
+     None, 204),
+    ('UserViewSet.me', 'get', '/api/v1/users/me/', 'author', None, 200),
+    ('CategoryViewSet.list', 'get', '/api/v1/categories/', None, None, 200),
+    ('CategoryViewSet.stats', 'get', '/api/v1/categories/film/stats/',
+     None, None, 200),
+    ('CategoryViewSet.create', 'post', '/api/v1/categories/', 'admin',
+     {'name': 'book', 'slug': 'book'}, 201),
+    ('CategoryViewSet.destroy', 'delete', '/api/v1/categories/film/',
+     'admin', None, 204),
+    ('GenreViewSet.list', 'get', '/api/v1/genres/', None, None, 200),
+    ('GenreViewSet.stats', 'get', '/api/v1/genres/drama/stats/', None,
+     None, 200),
+    ('GenreViewSet.create', 'post', '/api/v1/genres/', 'admin',
+     {'name': 'comedy', 'slug': 'comedy'}, 201),
+    ('GenreViewSet.destroy', 'delete', '/api/v1/genres/drama/', 'admin',
+     None, 204),
+    ('TitleViewSet.list', 'get', '/api/v1/titles/', None, None, 200),
+    ('TitleViewSet.retrieve', 'get', '/api/v1/titles/{title}/', None, None,
+     200),
+    ('TitleViewSet.similar', 'get', '/api/v1/titles/{title}/similar/', None,
+     None, 200),
+    ('TitleViewSet.suggest', 'get', '/api/v1/titles/suggest/?q=tit', None,
+     None, 200),
+    ('TitleViewSet.year_stats', 'get', '/api/v1/titles/years/2000/stats/',
+     None, None, 200),
+    ('TitleViewSet.create', 'post', '/api/v1/titles/', 'admin',
+     {'name': 'new', 'year': 2001, 'category': 'film', 'genre': ['drama']},
+     201),
+    ('TitleViewSet.update', 'put', '/api/v1/titles/{title}/', 'admin',
+     {'name': 'renamed', 'year': 2001, 'category': 'film',
+      'genre': ['drama']}, 200),
+    ('TitleViewSet.partial_update', 'patch', '/api/v1/titles/{title}/',
+     'admin', {'name': 'renamed'}, 200),
+    ('TitleViewSet.destroy', 'delete', '/api/v1/titles/{title}/', 'admin',
+     None, 204),
+    ('ReviewViewSet.list', 'get', '/api/v1/titles/{title}/reviews/', None,
+     None, 200),
+    ('ReviewViewSet.retrieve', 'get',
+     '/api/v1/titles/{title}/reviews/{review}/', None, None, 200),
+    ('ReviewViewSet.create', 'post', '/api/v1/titles/{title}/reviews/',
+     'reader', {'text': 'text', 'score': 7}, 201),
+    ('ReviewViewSet.update', 'put',
+     '/api/v1/titles/{title}/reviews/{review}/', 'author',
+     {'text': 'edited', 'score': 3}, 200),
+    ('ReviewViewSet.partial_update', 'patch',
+     '/api/v1/titles/{title}/reviews/{review}/', 'author', {'score': 3},
+     200),
+    ('ReviewViewSet.destroy', 'delete',
+     '/api/v1/titles/{title}/reviews/{review}/', 'author', None, 204),
+    ('CommentViewSet.list', 'get',
+     '/api/v1/titles/{title}/reviews/{review}/comments/', None, None, 200),
+    ('CommentViewSet.retrieve', 'get',
+     '/api/v1/titles/{title}/reviews/{review}/comments/{comment}/', None,
+     None, 200),
+    ('CommentViewSet.create', 'post',
+     '/api/v1/titles/{title}/reviews/{review}/comments/', 'reader',
+     {'text': 'text'}, 201),
+    ('CommentViewSet.update', 'put',
+     '/api/v1/titles/{title}/reviews/{review}/comments/{comment}/',
+     'author', {'text': 'edited'}, 200),
+    ('CommentViewSet.partial_update', 'patch',
+     '/api/v1/titles/{title}/reviews/{review}/comments/{comment}/',
+     'author', {'text': 'edited'}, 200),
+    ('CommentViewSet.destroy', 'delete',
+     '/api/v1/titles/{title}/reviews/{review}/comments/{comment}/',
+     'author', None, 204),
+)
+
+
+@pytest.fixture
+def objects(database_available, db):
+    from api.snapshot import title_snapshot
+    from reviews.catalog import catalog, rating_stats, title_index
+    from reviews.models import (ADMIN, Category, Comments, Genre, GenreTitle,
+                                Review, Title, User)
+    from reviews.stats import refresh_title_stats, refresh_user_stats
+
+    users = {
+        'admin': User.objects.create(
+            username='admin', email='admin@ya.ru', role=ADMIN
+        ),
+        'author': User.objects.create(
+            username='author', email='author@ya.ru'
+        ),
+        'reader': User.objects.create(
+            username='reader', email='reader@ya.ru'
+        ),
+    }
+    category = Category.objects.create(name='film', slug='film')
+    genre = Genre.objects.create(name='drama', slug='drama')
+    title = Title.objects.create(name='title', year=2000, category=category)
+    GenreTitle.objects.create(title=title, genre=genre)
+    review = Review.objects.create(
+        title=title, author=users['author'], text='text', score=5
+    )
+    comment = Comments.objects.create(
+        review=review, author=users['author'], text='text'
+    )
+    refresh_user_stats()
+    refresh_title_stats()
+    for versioned in (catalog, title_index, rating_stats,
+                      title_snapshot.columns, title_snapshot.ratings):
+        versioned._bump()
+    return {
+        'users': users,
+        'ids': {
+            'author': 'author', 'reader': 'reader', 'title': title.pk,
+            'review': review.pk, 'comment': comment.pk,
+        },
+    }
+
+
+def api_client(user):
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    client = APIClient()
+    if user is not None:
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(
+            RefreshToken.for_user(user).access_token
+        ))
+    return client
+
+
+@pytest.mark.parametrize(
+    'method, url, role, data, expected',
+    [endpoint[1:] for endpoint in ENDPOINTS],
+    ids=[endpoint[0] for endpoint in ENDPOINTS]
+)
+def test_action_fits_budget(objects, method, url, role, data, expected):
+    client = api_client(objects['users'].get(role))
+    response = getattr(client, method)(
+        url.format(**objects['ids']), data, format='json'
+    )
+    assert response.status_code == expected, response.content
+
+
+def test_moderation_has_more_at_cap(objects, monkeypatch):
+    from reviews.models import Comments
+
+    monkeypatch.setattr('api.views.MAX_MODERATION_IDS', 2)
+    review = Comments.objects.get().review
+    for _ in range(3):
+        Comments.objects.create(
+            review=review, author=objects['users']['author'], text='text'
+        )
+    client = api_client(objects['users']['admin'])
+
+    results = [
+        client.post(
+            '/api/v1/moderation/comments/', {'author': 'author'},
+            format='json'
+        ).json()
+        for _ in range(3)
+    ]
+
+    assert results == [
+        {'deleted': 2, 'has_more': True},
+        {'deleted': 2, 'has_more': False},
+        {'deleted': 0, 'has_more': False},
+    ]
+    assert not Comments.objects.exists()
+
+
+def test_user_counters_follow_deletes(objects):
+    ids = objects['ids']
+    review_url = '/api/v1/titles/{title}/reviews/{review}/'.format(**ids)
+    author = api_client(objects['users']['author'])
+    reader = api_client(objects['users']['reader'])
+    admin = api_client(objects['users']['admin'])
+
+    def counters(username):
+        user = admin.get(f'/api/v1/users/{username}/').json()
+        return (
+            user['reviews_count'], user['comments_count'],
+            user['average_score']
+        )
+
+    author.delete(f'{review_url}comments/{ids["comment"]}/')
+    assert counters('author') == (1, 0, 5)
+    reader.post(f'{review_url}comments/', {'text': 'text'}, format='json')
+    assert counters('reader') == (0, 1, None)
+
+    response = author.delete(review_url)
+
+    assert response.status_code == 204
+    assert counters('author') == (0, 0, None)
+    assert counters('reader') == (0, 0, None)
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('ёж', ['Ёжик в тумане']),
+    ('ЕЖИК', ['Ёжик в тумане']),
+    ('ёл', ['Елка']),
+    ('зелё', ['Зелёная миля']),
+])
+def test_suggest_ignores_yo(objects, query, expected):
+    from reviews.catalog import title_index
+    from reviews.models import Title
+
+    for name in ('Ёжик в тумане', 'Елка', 'Зелёная миля'):
+        Title.objects.create(name=name, year=2000)
+    title_index._bump()
+
+    response = api_client(None).get(
+        '/api/v1/titles/suggest/', {'q': query}
+    )
+
+    assert response.status_code == 200
+    assert [title['name'] for title in response.json()] == expected
+
+
+@pytest.mark.parametrize('ordering, expected', [
+    ('-rating', ['tied late', 'tied early', 'title', 'unrated']),
+    ('rating', ['title', 'tied early', 'tied late', 'unrated']),
+])
+def test_rating_ordering_with_ties_and_gaps(objects, ordering, expected):
+    from api.snapshot import title_snapshot
+    from reviews.models import Review, Title
+    from reviews.stats import refresh_title_stats
+
+    for name, score in (('tied early', 8), ('unrated', None),
+                        ('tied late', 8)):
+        title = Title.objects.create(name=name, year=2000)
+        if score is not None:
+            Review.objects.create(
+                title=title, author=objects['users']['reader'],
+                text='text', score=score
+            )
+    refresh_title_stats()
+    title_snapshot.columns._bump()
+    title_snapshot.ratings._bump()
+
+    response = api_client(None).get(
+        '/api/v1/titles/', {'ordering': ordering}
+    )
+
+    assert response.status_code == 200
+    assert [
+        title['name'] for title in response.json()['results']
+    ] == expected
+
+
+def test_batch_entries_follow_stats(objects, transactional_db):
+    """Рейтинг и счётчики меняются без записи в произведение
+    и пользователя, но закэшированная пачка всё равно обновляется.
+    """
+    ids = objects['ids']
+    reader = api_client(objects['users']['reader'])
+    admin = api_client(objects['users']['admin'])
+
+    def batch(url):
+        return admin.get(url).json()['results'][0]
+
+    titles_url = '/api/v1/titles/?ids={title}'.format(**ids)
+    users_url = '/api/v1/users/?usernames=reader'
+    assert batch(titles_url)['rating'] == 5
+    assert batch(users_url)['comments_count'] == 0
+
+    reader.post(
+        '/api/v1/titles/{title}/reviews/'.format(**ids),
+        {'text': 'text', 'score': 9}, format='json'
+    )
+    reader.post(
+        '/api/v1/titles/{title}/reviews/{review}/comments/'.format(**ids),
+        {'text': 'text'}, format='json'
+    )
+
+    assert batch(titles_url)['rating'] == 7
+    assert batch(users_url)['reviews_count'] == 1
+    assert batch(users_url)['comments_count'] == 1
@@ -0,0 +1,55 @@
+import pytest
+from django.core.paginator import EmptyPage
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def low_estimate(database_available, db, monkeypatch):
+    """30 жанров при оценке планировщика в 12 строк."""
+    from reviews.models import Genre
+    from reviews.pagination import EstimatedCountPaginator
+
+    for number in range(30):
+        Genre.objects.create(name=f'genre {number}', slug=f'genre-{number}')
+    monkeypatch.setattr(
+        EstimatedCountPaginator, 'estimate', lambda self, sql, params: 12
+    )
+    return Genre.objects.order_by('pk')
+
+
+def test_pages_past_low_estimate_are_served(low_estimate):
+    from reviews.pagination import EstimatedCountPaginator
+
+    paginator = EstimatedCountPaginator(low_estimate, 10, threshold=10)
+
+    second = paginator.page(2)
+    last = paginator.page(3)
+
+    assert paginator.count_is_approximate
+    assert second.has_next()
+    assert len(last) == 10
+    assert not last.has_next()
+    assert paginator.count == 30
+    with pytest.raises(EmptyPage):
+        paginator.page(4)
+
+
+def test_api_page_past_low_estimate(low_estimate, monkeypatch):
+    from api.views import UserViewSet
+    from reviews.models import ADMIN, User
+
+    for number in range(25):
+        User.objects.create(username=f'user{number}', email=f'{number}@ya.ru')
+    admin = User.objects.create(
+        username='admin', email='admin@ya.ru', role=ADMIN
+    )
+    monkeypatch.setattr(UserViewSet, 'count_threshold', 10, raising=False)
+    client = APIClient()
+    client.force_authenticate(admin)
+
+    response = client.get('/api/v1/users/', {'page': 3})
+
+    assert response.status_code == 200
+    assert len(response.json()['results']) == 6
+    assert response.json()['next'] is None
+    assert response.json()['count_is_approximate'] is True
@@ -0,0 +1,69 @@
+import pytest
+from api.querybudget import (QueryBudgetExceeded, check_queries, fingerprint,
+                             repeated_queries, view_budget)
+
+
+def queries(*statements):
+    return [{'sql': sql, 'params': (), 'alias': 'default'}
+            for sql in statements]
+
+
+class DummyViewSet:
+    query_budget = {'list': 2, 'retrieve': 1}
+
+
+def dummy_view():
+    pass
+
+
+dummy_view.cls = DummyViewSet
+dummy_view.actions = {'get': 'list', 'post': 'create'}
+
+
+class TestFingerprint:
+
+    def test_literals_and_in_lists_are_normalized(self):
+        assert fingerprint(
+            "SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'a'"
+        ) == fingerprint(
+            "SELECT * FROM t WHERE id IN (%s)  AND name = 'bb'"
+        )
+
+    def test_different_queries_differ(self):
+        assert fingerprint('SELECT a FROM t') != fingerprint(
+            'SELECT b FROM t'
+        )
+
+
+class TestCheckQueries:
+
+    def test_n_plus_one_is_detected(self):
+        found = repeated_queries(queries(
+            'SELECT * FROM users WHERE id = %s',
+            'SELECT * FROM users WHERE id = %s',
+            'SELECT * FROM users WHERE id = %s',
+            'SELECT * FROM titles',
+        ))
+        assert list(found.values()) == [3]
+
+    def test_budget_is_enforced(self):
+        assert check_queries(queries('SELECT a', 'SELECT b'), budget=2) == []
+        problems = check_queries(
+            queries('SELECT a', 'SELECT b', 'SELECT c'), budget=2
+        )
+        assert len(problems) == 1
+
+    def test_savepoints_are_not_counted(self):
+        assert check_queries(queries(
+            'SAVEPOINT "s1"', 'SELECT 1', 'RELEASE SAVEPOINT "s1"'
+        ), budget=1) == []
+
+    def test_view_budget_by_action(self):
+        assert view_budget(dummy_view, 'GET') == 2
+        assert view_budget(dummy_view, 'POST') is None
+        assert view_budget(lambda request: None, 'GET') is None
+
+    def test_fixture_raises_on_exceeded_budget(self, query_budget):
+        with pytest.raises(QueryBudgetExceeded):
+            with query_budget(0) as recorded:
+                recorded.extend(queries('SELECT 1'))
@@ -0,0 +1,105 @@
+from statistics import mean, pvariance
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.fixture
+def rated_titles(database_available, db):
+    from reviews.models import Category, Genre, GenreTitle, Review, Title, User
+    from reviews.stats import refresh_title_stats
+
+    categories = [
+        Category.objects.create(name=slug, slug=slug)
+        for slug in ('film', 'book')
+    ]
+    genres = [
+        Genre.objects.create(name=slug, slug=slug)
+        for slug in ('drama', 'comedy')
+    ]
+    users = [
+        User.objects.create(username=f'user{i}', email=f'user{i}@ya.ru')
+        for i in range(5)
+    ]
+    for number in range(12):
+        title = Title.objects.create(
+            name=f'title {number}',
+            year=2000 + number % 3,
+            category=categories[number % 2] if number % 4 else None,
+        )
+        for genre in genres[:number % 2 + 1]:
+            GenreTitle.objects.create(title=title, genre=genre)
+        for user in users[:number % 5]:
+            Review.objects.create(
+                title=title, author=user, text='text',
+                score=(number * 7 + user.pk) % 10 + 1
+            )
+    refresh_title_stats()
+
+
+def stored_stats():
+    from reviews.models import RatingStats
+    return {
+        (stats.dimension, stats.key): (
+            stats.reviews_count, stats.average, stats.variance
+        )
+        for stats in RatingStats.objects.all()
+    }
+
+
+def expected_stats():
+    from reviews.models import RatingStats, Review
+    scores = {}
+    for review in Review.objects.filter(
+            title__is_deleted=False).select_related('title'):
+        title = review.title
+        groups = [(RatingStats.YEAR, title.year)] + [
+            (RatingStats.GENRE, genre_id)
+            for genre_id in title.genre.values_list('pk', flat=True)
+        ]
+        if title.category_id is not None:
+            groups.append((RatingStats.CATEGORY, title.category_id))
+        for group in groups:
+            scores.setdefault(group, []).append(review.score)
+    return {
+        group: (len(values), mean(values), pvariance(values))
+        for group, values in scores.items()
+    }
+
+
+def assert_same(stored, expected):
+    assert stored.keys() == expected.keys()
+    for group, (count, average, variance) in expected.items():
+        assert stored[group][0] == count
+        assert stored[group][1] == pytest.approx(average)
+        assert stored[group][2] == pytest.approx(variance)
+
+
+def test_full_build(rated_titles):
+    call_command('build_rating_stats', '--chunk-size', '7')
+    assert_same(stored_stats(), expected_stats())
+
+
+def test_incremental_refresh(rated_titles):
+    from reviews.changes import record_changes
+    from reviews.models import Category, Review, Title, Watermark
+    from reviews.stats import delete_reviews, refresh_title_stats
+
+    call_command('build_rating_stats')
+    assert Watermark.objects.filter(name='rating_stats').exists()
+    delete_reviews(Review.objects.filter(pk=Review.objects.first().pk))
+    review = Review.objects.last()
+    Review.objects.filter(pk=review.pk).update(score=review.score % 10 + 1)
+    record_changes(Review, [review.pk])
+    moved = Title.objects.filter(reviews_count__gt=0).first()
+    Title.objects.filter(pk=moved.pk).update(
+        category=Category.objects.get(slug='book'), year=1999
+    )
+    deleted = Title.objects.exclude(pk=moved.pk).filter(
+        reviews_count__gt=0).last()
+    Title.objects.filter(pk=deleted.pk).update(is_deleted=True)
+    record_changes(Title, [moved.pk, deleted.pk])
+    refresh_title_stats()
+
+    call_command('build_rating_stats')
+    assert_same(stored_stats(), expected_stats())
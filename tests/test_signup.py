@@ -0,0 +1,20 @@
+import pytest
+from rest_framework.test import APIClient
+
+
+@pytest.mark.parametrize('email', ['U1@X.com', 'u1@X.COM'])
+def test_signup_email_differs_only_in_case(database_available, db, email):
+    from reviews.models import User
+
+    User.objects.create(username='first', email='u1@x.com')
+
+    response = APIClient().post(
+        '/api/v1/auth/signup/', {'username': 'second', 'email': email},
+        format='json'
+    )
+
+    assert response.status_code == 400
+    assert response.json() == {
+        'email': ['Пользователь с таким email уже существует.']
+    }
+    assert not User.objects.filter(username='second').exists()
@@ -0,0 +1,56 @@
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+
+
+@pytest.fixture
+def titles(database_available, db):
+    from reviews.models import Title, User
+
+    users = [
+        User.objects.create(username=f'user{i}', email=f'user{i}@ya.ru')
+        for i in range(3)
+    ]
+    return users, [
+        Title.objects.create(name=f'title {number}', year=2000)
+        for number in range(5)
+    ]
+
+
+def review(user, title, score):
+    from reviews.models import Review
+
+    return Review.objects.create(
+        title=title, author=user, text='text', score=score
+    )
+
+
+def stored_pairs():
+    from reviews.models import TitleSimilarity
+
+    return set(TitleSimilarity.objects.values_list('title_id', 'similar_id'))
+
+
+def test_incremental_run_updates_affected_pairs(titles):
+    from reviews.models import TitleSimilarity, Watermark
+
+    users, (first, second, third, left, right) = titles
+    for user in users[:2]:
+        review(user, first, 8)
+        review(user, second, 6)
+    call_command('build_similarity')
+    assert stored_pairs() == {(first.pk, second.pk), (second.pk, first.pk)}
+    # Пара, которую пересчитал бы только полный прогон.
+    TitleSimilarity.objects.create(title=left, similar=right, score=0.5)
+
+    cache.clear()
+    last = [review(user, third, 7) for user in users[:2]][-1]
+    call_command('build_similarity')
+
+    assert stored_pairs() == {
+        (first.pk, second.pk), (second.pk, first.pk),
+        (first.pk, third.pk), (third.pk, first.pk),
+        (second.pk, third.pk), (third.pk, second.pk),
+        (left.pk, right.pk),
+    }
+    assert Watermark.objects.get(name='similarity').value == last.pk
@@ -0,0 +1,52 @@
+import pytest
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def admin_client(database_available, db):
+    from reviews.catalog import catalog
+    from reviews.models import ADMIN, User
+
+    catalog._bump()
+    client = APIClient()
+    client.force_authenticate(
+        User.objects.create(username='admin', email='admin@ya.ru', role=ADMIN)
+    )
+    return client
+
+
+@pytest.mark.parametrize('url', ['/api/v1/categories/', '/api/v1/genres/'])
+def test_slug_is_free_after_delete(admin_client, url):
+    data = {'name': 'film', 'slug': 'film'}
+    assert admin_client.post(url, data, format='json').status_code == 201
+    assert admin_client.delete(f'{url}film/').status_code == 204
+
+    response = admin_client.post(url, data, format='json')
+
+    assert response.status_code == 201, response.content
+    assert response.json()['slug'] == 'film'
+
+
+def test_deleted_author_reviews_leave_rating(admin_client):
+    from reviews.models import Category, Review, Title, User
+    from reviews.stats import refresh_title_stats
+
+    title = Title.objects.create(
+        name='title', year=2000,
+        category=Category.objects.create(name='film', slug='film')
+    )
+    for username, score in (('kept', 8), ('gone', 2)):
+        Review.objects.create(
+            title=title, text='text', score=score,
+            author=User.objects.create(
+                username=username, email=f'{username}@ya.ru'
+            ),
+        )
+    refresh_title_stats()
+
+    response = admin_client.delete('/api/v1/users/gone/')
+
+    assert response.status_code == 204
+    title.refresh_from_db()
+    assert title.reviews_count == 1
+    assert title.rating == 8